@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+"""Micro-benchmark of search value classification: regular expression cascade (previously used by `search` view)
+versus single-pass `bravo_browser.search_query.classify`.
+
+`classify` also parses region positions into integers (with ',' removed), which the cascade left as strings, so
+'cascade+int' is the cascade followed by the same parsing. Functions are timed in alternating rounds and the fastest
+round is reported, which keeps the comparison stable on a busy machine.
+
+Usage (from the repository root): python -m benchmarks.benchmark_search [number of calls per round]
+"""
+
+import re
+import sys
+import timeit
+from bravo_browser.search_query import classify
+
+
+_regex_pattern_chr = r'^(?:CHR)?(\d+|X|Y|M|MT)'
+_regex_pattern_chr_pos = _regex_pattern_chr + r'\s*[-:/]\s*([\d,]+)'
+_regex_pattern_chr_start_end = _regex_pattern_chr_pos + r'\s*[-:/]\s*([\d,]+)'
+_regex_pattern_chr_pos_ref_alt = _regex_pattern_chr_pos + r'\s*[-:/]\s*([ATCG]+)\s*[-:/]\s*([ATCG]+)'
+_regex_pattern_rsid = r'^(?:rs)(\d+)'
+
+_regex_chr_start_end = re.compile(_regex_pattern_chr_start_end+'$', re.IGNORECASE)
+_regex_chr_pos_ref_alt = re.compile(_regex_pattern_chr_pos_ref_alt+'$', re.IGNORECASE)
+_regex_rsid = re.compile(_regex_pattern_rsid+'$')
+
+
+def cascade(value):
+    match = _regex_chr_start_end.match(value)
+    if match is not None:
+        return ('region', match.groups()[0], match.groups()[1], match.groups()[2])
+    match = _regex_chr_pos_ref_alt.match(value)
+    if match is not None:
+        variant_id = f'{match.groups()[0]}-{match.groups()[1]}-{match.groups()[2]}-{match.groups()[3]}'.upper()
+        if variant_id.startswith('CHR'):
+            variant_id = variant_id[3:]
+        return ('variant', variant_id)
+    match = _regex_rsid.match(value)
+    if match is not None:
+        return ('rsid', value)
+    return ('gene', value)
+
+
+def cascade_int(value):
+    result = cascade(value)
+    if result[0] == 'region':
+        return (result[0], result[1], int(result[2].replace(',', '')), int(result[3].replace(',', '')))
+    return result
+
+
+VALUES = [ 'chr22:50000-50100', '22-100-A-C', 'rs123456', 'PCSK9', 'BRCA1', 'chrX-1000-AT-A' ]
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = 20
+    funcs = [ ('cascade', cascade), ('cascade+int', cascade_int), ('classify', classify) ]
+    totals = { name: 0 for name, _ in funcs }
+    print(f"{'value':>20}" + ''.join(f' {name:>12}' for name, _ in funcs))
+    for value in VALUES:
+        best = { name: float('inf') for name, _ in funcs }
+        for _ in range(rounds):
+            for name, func in funcs:
+                best[name] = min(best[name], timeit.timeit(lambda: func(value), number = number) / number)
+        for name, _ in funcs:
+            totals[name] += best[name]
+        print(f'{value:>20}' + ''.join(f" {f'{best[name] * 1e9:.0f} ns':>12}" for name, _ in funcs))
+    print(f'{"mean":>20}' + ''.join(f" {f'{totals[name] * 1e9 / len(VALUES):.0f} ns':>12}" for name, _ in funcs))
+
+if __name__ == '__main__':
+    main()
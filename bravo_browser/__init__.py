@@ -17,16 +17,37 @@ def create_app(test_config=None):
 
     from bravo_browser.models.database import mongo, create_users, load_whitelist
     mongo.init_app(app)
+    from bravo_browser.models import users
+    users.init_app(app)
+    from bravo_browser.models.write_behind import write_behind
+    write_behind.init_app(app)
     app.cli.add_command(create_users)
     app.cli.add_command(load_whitelist)
 
+    from bravo_browser.cache import cache
+    from bravo_browser.api_client import api
+    cache.init_app(app)
+    api.init_app(app)
+
+    from bravo_browser.genes import gene_index, build_gene_index
+    gene_index.init_app(app)
+    app.cli.add_command(build_gene_index)
+    from bravo_browser.rsids import rsid_index, build_rsid_index
+    rsid_index.init_app(app)
+    app.cli.add_command(build_rsid_index)
+
     from bravo_browser import browser
     app.register_blueprint(browser.bp, url_prefix=app.config['URL_PREFIX'])
     if app.config['GZIP_COMPRESSION']:
-        app.config['COMPRESS_MIMETYPES'] = ['application/json']
+        app.config['COMPRESS_MIMETYPES'] = ['application/json', 'application/x-ndjson', 'application/vnd.bravo.columnar', 'multipart/mixed']
         app.config['COMPRESS_LEVEL'] = 3
         app.config['COMPRESS_MIN_SIZE'] = 500
         browser.compress.init_app(app)
+        from bravo_browser.compression import compress_static
+        app.cli.add_command(compress_static)
+    browser.autocomplete_cache.init_app(app)
     browser.login_manager.init_app(app)
+    from bravo_browser.oauth import oauth
+    oauth.init_app(app)
 
     return app
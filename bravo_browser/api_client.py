@@ -0,0 +1,290 @@
+from flask import current_app, request, has_request_context
+from requests.adapters import HTTPAdapter
+from bravo_browser.cache import cache, normalize_url, MemoryBackend
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import functools
+import gzip
+import json
+import threading
+import os
+
+
+class BufferedResponse(object):
+    """Fully read API response which can be shared between callers and stored in the response cache.
+
+    The body is kept as it was received, i.e. gzip-compressed if API compressed it, so it can be forwarded to
+    the client without decompressing and compressing it again. `content` returns decompressed body.
+    """
+    __slots__ = ('status_code', 'headers', 'body', 'content_encoding')
+
+    def __init__(self, status_code, headers, body, content_encoding = None):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.content_encoding = content_encoding
+
+    @classmethod
+    def from_response(cls, response):
+        """Reads body of the streamed `requests.Response` without decoding it."""
+        try:
+            body = response.raw.read(decode_content = False)
+        finally:
+            response.raw.release_conn()
+        headers = { k: v for k, v in response.headers.items() if k.lower() == 'content-type' }
+        content_encoding = response.headers.get('Content-Encoding', None)
+        if content_encoding is not None:
+            content_encoding = content_encoding.strip().lower()
+            if content_encoding not in ('gzip', 'identity'):
+                raise requests.exceptions.ContentDecodingError(f'Unsupported Content-Encoding "{content_encoding}".')
+            if content_encoding == 'identity':
+                content_encoding = None
+        return cls(response.status_code, headers, body, content_encoding)
+
+    @property
+    def content(self):
+        if self.content_encoding == 'gzip':
+            return gzip.decompress(self.body)
+        return self.body
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class SingleFlight(object):
+    """De-duplicates concurrent identical calls: the first caller runs the call, others wait and share its result."""
+
+    class _Call(object):
+        __slots__ = ('event', 'result', 'error')
+
+        def __init__(self):
+            self.event = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._Call()
+                self._calls[key] = call
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    def __len__(self):
+        return len(self._calls)
+
+
+class ApiClient(object):
+    """Pooled HTTP client for the BRAVO API.
+
+    Every worker process keeps one `requests.Session` with a keep-alive connection pool to
+    BRAVO_API_URI, so proxy views reuse open connections instead of doing a TCP handshake per call.
+    The session is created lazily inside the worker (i.e. after gunicorn forks).
+
+    Concurrent identical API calls within a worker share one in-flight request (see `SingleFlight`).
+    Responses of routes listed in BRAVO_API_CACHE_TTLS are kept in the response cache (see cache.py).
+
+    Next pages of paginated views can be fetched speculatively with `prefetch` and kept for a short time per
+    user session (see `prefetched`).
+
+    Independent API calls can be fanned out concurrently with `submit` and `get_many`. When served by
+    gunicorn's gevent worker (see config/gunicorn_gevent.py) threads are monkey-patched into greenlets, so a
+    single worker can keep hundreds of API calls in flight.
+    """
+
+    def __init__(self, app=None):
+        self._session = None
+        self._session_pid = None
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._in_flight = SingleFlight()
+        self._prefetched = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('BRAVO_API_POOL_CONNECTIONS', 1)
+        app.config.setdefault('BRAVO_API_POOL_MAXSIZE', 10)
+        app.config.setdefault('BRAVO_API_POOL_BLOCK', False)
+        app.config.setdefault('BRAVO_API_MAX_RETRIES', 1)
+        app.config.setdefault('BRAVO_API_CONCURRENCY', 10)
+        app.config.setdefault('BRAVO_API_SINGLE_FLIGHT', True)
+        app.config.setdefault('BRAVO_API_TIMEOUT', (3.05, 30))
+        app.config.setdefault('BRAVO_API_ROUTE_TIMEOUTS', {})
+        app.config.setdefault('BRAVO_API_PREFETCH_TTL', 60)
+        app.config.setdefault('BRAVO_API_PREFETCH_MAX_ENTRIES', 200)
+        app.config.setdefault('BRAVO_API_PREFETCH_MAX_BYTES', 32 * 1024 * 1024)
+        self._prefetched = MemoryBackend(app.config['BRAVO_API_PREFETCH_MAX_ENTRIES'], app.config['BRAVO_API_PREFETCH_MAX_BYTES'])
+        app.extensions['bravo_api_client'] = self
+
+    def _create_session(self, config):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections = config['BRAVO_API_POOL_CONNECTIONS'],
+            pool_maxsize = config['BRAVO_API_POOL_MAXSIZE'],
+            pool_block = config['BRAVO_API_POOL_BLOCK'],
+            max_retries = config['BRAVO_API_MAX_RETRIES'])
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['Accept-Encoding'] = 'gzip'
+        return session
+
+    @property
+    def session(self):
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._lock:
+                if self._session is None or self._session_pid != pid:
+                    self._session = self._create_session(current_app.config)
+                    self._session_pid = pid
+        return self._session
+
+    @property
+    def executor(self):
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._lock:
+                if self._executor is None or self._executor_pid != pid:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers = current_app.config['BRAVO_API_CONCURRENCY'],
+                        thread_name_prefix = 'bravo-api')
+                    self._executor_pid = pid
+        return self._executor
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait = False)
+            self._session = None
+            self._session_pid = None
+            self._executor = None
+            self._executor_pid = None
+
+    @staticmethod
+    def route():
+        """Returns name of the current view function or None outside of request."""
+        if has_request_context() and request.endpoint:
+            return request.endpoint.rsplit('.', 1)[-1]
+        return None
+
+    def timeout(self, route = None):
+        """Returns timeout for the route (by default, the current one) or the default one."""
+        config = current_app.config
+        return config['BRAVO_API_ROUTE_TIMEOUTS'].get(route or self.route(), config['BRAVO_API_TIMEOUT'])
+
+    def cache_ttl(self, route = None):
+        """Returns response cache time-to-live in seconds for the route (by default, the current one) or 0 if it is not cached."""
+        if not cache.enabled:
+            return 0
+        return current_app.config['BRAVO_API_CACHE_TTLS'].get(route or self.route(), 0)
+
+    def url(self, path):
+        return f"{current_app.config['BRAVO_API_URI']}{path}"
+
+    def get(self, path, cache_ttl=None, **kwargs):
+        """Sends GET request to BRAVO API.
+
+        Non-streaming calls return `BufferedResponse`. Concurrent identical non-streaming calls are coalesced into
+        one. Successful responses of cached routes are served from and stored to the response cache.
+
+        Arguments:
+        path -- API path with query string, e.g. '/genes?name=PCSK9'.
+        cache_ttl -- response cache time-to-live in seconds; 0 disables caching. By default, it is set by route.
+        kwargs -- passed to `requests.Session.get`.
+        """
+        if cache_ttl is None:
+            cache_ttl = self.cache_ttl()
+        kwargs.setdefault('timeout', self.timeout())
+        if kwargs.get('stream', False):
+            return self.session.get(self.url(path), **kwargs)
+        key = normalize_url(path)
+        if cache_ttl:
+            response = cache.get(key)
+            if response is not None:
+                return response
+        fetch = functools.partial(self._fetch, path, key, cache_ttl, kwargs)
+        if not current_app.config['BRAVO_API_SINGLE_FLIGHT']:
+            return fetch()
+        headers = kwargs.get('headers', None)
+        return self._in_flight.do((key, tuple(sorted(headers.items())) if headers else ()), fetch)
+
+    def _fetch(self, path, key, cache_ttl, kwargs):
+        response = BufferedResponse.from_response(self.session.get(self.url(path), stream = True, **kwargs))
+        if cache_ttl and response.status_code == 200:
+            cache.set(key, response, cache_ttl)
+        return response
+
+    def _get_in_context(self, app, path, kwargs):
+        with app.app_context():
+            return self.get(path, **kwargs)
+
+    def submit(self, path, **kwargs):
+        """Sends GET request to BRAVO API in background and returns `concurrent.futures.Future`.
+
+        Timeout is resolved from the calling route, so it can be called from a view function.
+        """
+        app = current_app._get_current_object()
+        kwargs.setdefault('timeout', self.timeout())
+        kwargs.setdefault('cache_ttl', self.cache_ttl())
+        return self.executor.submit(self._get_in_context, app, path, kwargs)
+
+    def get_many(self, paths, **kwargs):
+        """Sends GET requests to BRAVO API concurrently. Returns responses in the order of `paths`."""
+        futures = [ self.submit(path, **kwargs) for path in paths ]
+        return [ future.result() for future in futures ]
+
+    def prefetch(self, path, owner):
+        """Sends GET request to BRAVO API in background and keeps successful response for `owner` (e.g. user session).
+
+        Response is kept for BRAVO_API_PREFETCH_TTL seconds (0 disables prefetching). A call to `get` with the same
+        path while prefetch is still in flight joins it. Returns `concurrent.futures.Future` or None if the response
+        is already prefetched.
+        """
+        ttl = current_app.config['BRAVO_API_PREFETCH_TTL']
+        if not ttl:
+            return None
+        key = (owner, normalize_url(path))
+        if self._prefetched.get(key) is not None:
+            return None
+        future = self.submit(path, cache_ttl = 0)
+        future.add_done_callback(functools.partial(self._store_prefetched, key, ttl))
+        return future
+
+    def _store_prefetched(self, key, ttl, future):
+        if future.exception() is None and future.result().status_code == 200:
+            self._prefetched.set(key, future.result(), ttl)
+
+    def prefetched(self, path, owner):
+        """Returns response prefetched for `owner` or None."""
+        if self._prefetched is None:
+            return None
+        return self._prefetched.get((owner, normalize_url(path)))
+
+
+api = ApiClient()
@@ -2,23 +2,33 @@ from flask import (
     current_app, Blueprint, request, jsonify, make_response, Response, abort, render_template,
     redirect, url_for, session, send_file, stream_with_context, send_from_directory)
 from flask_cors import CORS
-from flask_compress import Compress
 from flask_login import LoginManager, UserMixin, current_user, login_user, logout_user
-import google_auth_oauthlib.flow
 import functools
-import requests
 from webargs import fields
 from webargs.flaskparser import use_kwargs, use_args
 from datetime import timedelta
 import re
 import json
 import urllib.parse
+import concurrent.futures
+import uuid
+import requests
 from bravo_browser.models import users, feedbacks
+from bravo_browser.api_client import api, BufferedResponse
+from bravo_browser.cache import cache, PrefixCache
+from bravo_browser.coverage import downsample
+from bravo_browser.genes import gene_index
+from bravo_browser.rsids import rsid_index
+from bravo_browser.search_query import classify
+from bravo_browser import columnar, filters
+from bravo_browser.compression import Compress
+from bravo_browser.oauth import oauth
 
 bp = Blueprint('browser', __name__, template_folder='templates', static_folder='static')
 CORS(bp)
 
 compress = Compress()
+autocomplete_cache = PrefixCache()
 login_manager = LoginManager()
 
 
@@ -39,8 +49,7 @@ def user_loader(email):
 
 
 def get_authorization_url():
-    flow = google_auth_oauthlib.flow.Flow.from_client_secrets_file( current_app.config['GOOGLE_OAUTH_CLIENT_SECRET'],
-       scopes=['openid', 'https://www.googleapis.com/auth/userinfo.email'])
+    flow = oauth.flow()
     flow.redirect_uri = url_for('.oauth2callback', _external = True, _scheme = 'https')
     return flow.authorization_url(access_type = 'offline', include_granted_scopes = 'true')
 
@@ -61,6 +70,59 @@ def require_authorization(func):
     return authorization_wrapper
 
 
+_regex_next_origin = re.compile(rb'"next"\s*:\s*"(https?://[^/"]*)')
+
+
+def _strip_next_origin(content):
+    """Removes scheme and host from 'next' URL in JSON payload without decoding it.
+
+    We don't want to expose what is our API endpoint. The payload's 'next' key follows 'data', so it is searched from the end.
+    """
+    i = content.rfind(b'"next"')
+    if i < 0:
+        return content
+    match = _regex_next_origin.match(content, i)
+    if match is None:
+        return content
+    return content[:match.start(1)] + content[match.end(1):]
+
+
+def _proxy_json(api_response, strip_next_origin = False, content = None):
+    """Passes API's JSON payload to the client as is.
+
+    If API compressed the payload and the client accepts the same encoding, then the compressed body is forwarded
+    verbatim, i.e. without decompressing it here and compressing it again in flask_compress. `content` is the
+    already decompressed body, if the caller has it.
+    """
+    encoding = api_response.content_encoding
+    if not strip_next_origin and encoding is not None and request.accept_encodings[encoding]:
+        response = Response(api_response.body, status = 200, mimetype = 'application/json')
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+    if content is None:
+        content = api_response.content
+    if strip_next_origin:
+        content = _strip_next_origin(content)
+    return Response(content, status = 200, mimetype = 'application/json')
+
+
+def _proxy_page(api_response, content = None):
+    """Passes API's page of rows to the client as is or, if client explicitly accepts it, in columnar binary format.
+
+    Columnar format is opt-in for API clients (see `columnar`); the bundled web components request JSON.
+    """
+    if columnar.MIMETYPE in request.accept_mimetypes.values():
+        payload = json.loads(content) if content is not None else api_response.json()
+        if payload.get('next', None) is not None:
+            payload['next'] = _api_path(payload['next'])
+        response = Response(columnar.encode(payload), status = 200, mimetype = columnar.MIMETYPE)
+    else:
+        response = _proxy_json(api_response, strip_next_origin = True, content = content)
+    response.vary.add('Accept')
+    return response
+
+
 @bp.route('/favicon')
 @bp.route('/favicon.ico')
 def favicon():
@@ -71,10 +133,7 @@ def favicon():
 @bp.route('/oauth2callback', methods = ['GET', 'POST'])
 def oauth2callback():
     state = session['state']
-    flow = google_auth_oauthlib.flow.Flow.from_client_secrets_file(
-       current_app.config['GOOGLE_OAUTH_CLIENT_SECRET'],
-       scopes = ['openid', 'https://www.googleapis.com/auth/userinfo.email'],
-       state = state)
+    flow = oauth.flow(state = state)
     flow.redirect_uri = url_for('.oauth2callback', _external = True, _scheme = 'https')
     if current_app.config['PROXY'] and not request.url.startswith('https'): # current version of Google OAuth python library doesn't handle situation when behind HTTPS proxy server
         protocol = request.headers.get('X-Forwarded-Proto', '')
@@ -85,14 +144,7 @@ def oauth2callback():
     flow.fetch_token(authorization_response = authorization_response)
     credentials = flow.credentials
 
-    response = requests.get('https://accounts.google.com/.well-known/openid-configuration')
-    response.raise_for_status()
-    openid_endpoints = json.loads(response.text)
-    userinfo_endpoint = openid_endpoints['userinfo_endpoint']
-
-    response = requests.get(userinfo_endpoint, headers = { 'Authorization': f'Bearer {credentials.token}' })
-    response.raise_for_status()
-    userinfo = json.loads(response.text)
+    userinfo = oauth.userinfo(credentials.token)
 
     if not users.in_whitelist(userinfo['email']):
         abort(403)
@@ -176,17 +228,79 @@ def home():
     return render_template('home.html', show_brand = False, show_signin = current_app.config['GOOGLE_OAUTH_CLIENT_SECRET'] != '')
 
 
+def _completed_data(future):
+    """Returns 'data' of API payload if the background call completed successfully, otherwise None (not an empty list)."""
+    if not future.done() or future.exception() is not None:
+        return None
+    api_response = future.result()
+    if api_response.status_code != 200:
+        return None
+    payload = api_response.json()
+    return None if payload['error'] else payload['data']
+
+
+def _narrow_suggestions(matches, prefix, query):
+    """Narrows down complete suggestions for the query prefix to the query. Returns None if they can't answer the query."""
+    if query.startswith('rs') and not prefix.startswith('rs'):  # prefix had no rsID lookup
+        return None
+    upper_query = query.upper()
+    narrowed = []
+    for suggestion, keys in matches:
+        if suggestion['data']['feature'] == 'gene':
+            if keys[0].startswith(upper_query):
+                narrowed.append((suggestion, keys))
+        else:
+            rsid = next((x for x in keys if x.startswith(query)), None)
+            if rsid is not None:
+                narrowed.append((dict(suggestion, value = rsid), keys))
+    return narrowed
+
+
+@bp.record_once
+def _autocomplete_defaults(state):
+    state.app.config.setdefault('AUTOCOMPLETE_DEADLINE', 1.0)
+    state.app.config.setdefault('AUTOCOMPLETE_MAX_AGE', 3600)
+
+
 @bp.route('/autocomplete', methods = ['GET'])
 def autocomplete():
-    query = request.args.get('query', '')
-    suggestions = []
+    """Suggests genes and, if query starts with 'rs', variants.
+
+    API lookups run concurrently. Suggestions from lookups that didn't finish within AUTOCOMPLETE_DEADLINE seconds are left out.
+    Results are cached and a query can be answered from the complete cached result of its prefix (see `PrefixCache`).
+    """
+    query = request.args.get('query', '').strip()
+    matches = []  # (suggestion, keys to narrow down by)
+    complete = True
     if query:
-        api_response = requests.get(f"{current_app.config['BRAVO_API_URI']}/genes?name={query}")
-        if api_response.status_code == 200:
-            payload = api_response.json()
-            if not payload['error']:
-                for gene in payload['data']:
-                    suggestions.append({
+        cached = autocomplete_cache.get(query, _narrow_suggestions)
+        if cached is not None:
+            matches = cached
+        else:
+            genes_future = None if gene_index.loaded else api.submit(f"/genes?name={query}")
+            snv_future = api.submit(f"/snv?variant_id={query}") if query.startswith('rs') and not rsid_index.loaded else None
+            futures = [ x for x in (genes_future, snv_future) if x is not None ]
+            if futures:
+                done, _ = concurrent.futures.wait(futures, timeout = current_app.config['AUTOCOMPLETE_DEADLINE'])
+                complete = len(done) == len(futures)
+            if genes_future is None:
+                for name, chrom, start, stop, gene_type in gene_index.search(query):
+                    matches.append(({
+                       'value': name,
+                       'data': {
+                          'feature': 'gene',
+                          'chrom': chrom,
+                          'start': start,
+                          'stop': stop,
+                          'type': gene_type
+                       }
+                    }, (name.upper(),)))
+            else:
+                genes = _completed_data(genes_future)
+                if genes is None:  # failed or late lookup: the result must not be cached as if there were no matches
+                    complete = False
+                for gene in genes or []:
+                    matches.append(({
                        'value': gene['gene_name'],
                        'data': {
                           'feature': 'gene',
@@ -195,35 +309,40 @@ def autocomplete():
                           'stop': gene['stop'],
                           'type': gene['gene_type']
                        }
-                    })
-        if len(suggestions) < 10 and query.startswith('rs'):
-            api_response = requests.get(f"{current_app.config['BRAVO_API_URI']}/snv?variant_id={query}")
-            if api_response.status_code == 200:
-                payload = api_response.json()
-                if not payload['error']:
-                    for variant in payload['data']:
-                        suggestions.append({
-                           'value': [ x for x in variant['rsids'] if x.startswith(query) ][0],
-                           'data': {
-                              'feature': 'snv',
-                              'variant_id': variant['variant_id'],
-                              'type': variant['annotation']['region']['consequence'][0]
-                           }
-                        })
-    return make_response(jsonify({ "suggestions": suggestions }), 200)
-
-
-_regex_pattern_chr = r'^(?:CHR)?(\d+|X|Y|M|MT)'
-_regex_pattern_chr_pos = _regex_pattern_chr + r'\s*[-:/]\s*([\d,]+)'
-_regex_pattern_chr_start_end = _regex_pattern_chr_pos + r'\s*[-:/]\s*([\d,]+)'
-_regex_pattern_chr_pos_ref_alt = _regex_pattern_chr_pos + r'\s*[-:/]\s*([ATCG]+)\s*[-:/]\s*([ATCG]+)'
-_regex_pattern_rsid = r'^(?:rs)(\d+)'
-
-_regex_chr = re.compile(_regex_pattern_chr+'$', re.IGNORECASE)
-_regex_chr_pos = re.compile(_regex_pattern_chr_pos+'$', re.IGNORECASE)
-_regex_chr_start_end = re.compile(_regex_pattern_chr_start_end+'$', re.IGNORECASE)
-_regex_chr_pos_ref_alt = re.compile(_regex_pattern_chr_pos_ref_alt+'$', re.IGNORECASE)
-_regex_rsid = re.compile(_regex_pattern_rsid+'$')
+                    }, (gene['gene_name'].upper(),)))
+            if len(matches) < 10 and snv_future is None and query.startswith('rs'):
+                for rsid, variant_id, variant_type in rsid_index.search(query, limit = 10 - len(matches)):
+                    matches.append(({
+                       'value': rsid,
+                       'data': {
+                          'feature': 'snv',
+                          'variant_id': variant_id,
+                          'type': variant_type
+                       }
+                    }, (rsid,)))
+            elif snv_future is not None:
+                variants = _completed_data(snv_future)
+                if variants is None:
+                    complete = False
+                for variant in variants if variants is not None and len(matches) < 10 else []:
+                    matches.append(({
+                       'value': [ x for x in variant['rsids'] if x.startswith(query) ][0],
+                       'data': {
+                          'feature': 'snv',
+                          'variant_id': variant['variant_id'],
+                          'type': variant['annotation']['region']['consequence'][0]
+                       }
+                    }, tuple(variant['rsids'])))
+            if complete:
+                # Only results with less than 10 suggestions have all matches of the query, so they can answer longer queries.
+                autocomplete_cache.set(query, matches, len(matches) < 10)
+    response = make_response(jsonify({ "suggestions": [ suggestion for suggestion, _ in matches ] }), 200)
+    if complete:
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config['AUTOCOMPLETE_MAX_AGE']
+    else:
+        response.cache_control.no_cache = True
+    return response
 
 
 search_argmap = {
@@ -244,6 +363,78 @@ search_argmap = {
 }
 
 
+@bp.record_once
+def _search_defaults(state):
+    state.app.config.setdefault('SEARCH_CACHE_TTL', 86400)
+    state.app.config.setdefault('SEARCH_CACHE_NEGATIVE_TTL', 300)
+
+
+def _resolve_search(key, resolve):
+    """Returns (endpoint, values) of redirect target for typed search value, or (None, None) if nothing was found.
+
+    Resolved targets are kept in the response cache for SEARCH_CACHE_TTL seconds and not found ones for
+    SEARCH_CACHE_NEGATIVE_TTL seconds. Returns None without caching if API call failed.
+
+    Arguments:
+    key -- normalized search value, e.g. 'rsid:rs123'.
+    resolve -- function which resolves the target with API call.
+    """
+    key = f'search:{key}'
+    if cache.enabled:
+        target = cache.get(key)
+        if target is not None:
+            return target
+    target = resolve()
+    if target is not None and cache.enabled:
+        ttl = current_app.config['SEARCH_CACHE_TTL' if target[0] is not None else 'SEARCH_CACHE_NEGATIVE_TTL']
+        if ttl:
+            cache.set(key, target, ttl)
+    return target
+
+
+def _resolve_variant_id(variant_id):
+    api_response = api.get(f"/snv?variant_id={variant_id}")
+    if api_response.status_code != 200:
+        return None
+    payload = api_response.json()
+    if payload['error']:
+        return None
+    for variant in payload['data']:
+        if variant['variant_id'] == variant_id:
+            return ('.variant_page', { 'variant_type': 'snv', 'variant_id': variant['variant_id'] })
+    return (None, None)
+
+
+def _resolve_rsid(rsid):
+    variants = rsid_index.lookup(rsid)
+    if variants:
+        return ('.variant_page', { 'variant_type': 'snv', 'variant_id': variants[0][0] })
+    # Local table may be missing, stale or partial, so only API can tell that the rsID doesn't exist.
+    api_response = api.get(f"/snv?variant_id={rsid}")
+    if api_response.status_code != 200:
+        return None
+    payload = api_response.json()
+    if payload['error']:
+        return None
+    for variant in payload['data']:
+        if any(x == rsid for x in variant['rsids']):
+            return ('.variant_page', { 'variant_type': 'snv', 'variant_id': variant['variant_id'] })
+    return (None, None)
+
+
+def _resolve_gene_name(gene_name):
+    api_response = api.get(f"/genes?name={gene_name}")
+    if api_response.status_code != 200:
+        return None
+    payload = api_response.json()
+    if payload['error']:
+        return None
+    for gene in payload['data']:
+        if gene['gene_name'].upper() == gene_name.upper():
+            return ('.gene_page', { 'variants_type': 'snv', 'gene_name': gene_name.upper() })
+    return (None, None)
+
+
 @bp.route('/search', methods = ['GET'])
 @use_args(search_argmap, location='query')
 def search(args):
@@ -260,57 +451,23 @@ def search(args):
         }
         return redirect(url_for('.variant_page', **args))
     else:  # typed value
-        match = _regex_chr_start_end.match(args['value'])
-        if match is not None:
+        query = classify(args['value'])
+        if query.kind == 'region' or query.kind == 'position':
             args = {
                'variants_type': 'snv',
-               'chrom': match.groups()[0],
-               'start': match.groups()[1],
-               'stop': match.groups()[2]}
+               'chrom': query.chrom,
+               'start': query.start,
+               'stop': query.stop}
             return redirect(url_for('.region_page', **args))
+        if query.kind == 'variant':
+            variant_id = f'{query.chrom}-{query.start}-{query.ref}-{query.alt}'
+            target = _resolve_search(f'variant:{variant_id}', functools.partial(_resolve_variant_id, variant_id))
+        elif query.kind == 'rsid':
+            target = _resolve_search(f'rsid:{query.value}', functools.partial(_resolve_rsid, query.value))
         else:
-            match = _regex_chr_pos_ref_alt.match(args['value'])
-            if match is not None:
-                variant_id = f'{match.groups()[0]}-{match.groups()[1]}-{match.groups()[2]}-{match.groups()[3]}'.upper()
-                if variant_id.startswith('CHR'):
-                    variant_id = variant_id[3:]
-                api_response = requests.get(f"{current_app.config['BRAVO_API_URI']}/snv?variant_id={variant_id}")
-                if api_response.status_code == 200:
-                    payload = api_response.json()
-                    if not payload['error']:
-                        for variant in payload['data']:
-                            if variant['variant_id'] == variant_id:
-                                args = {
-                                   'variant_type': 'snv',
-                                   'variant_id': variant['variant_id']
-                                }
-                                return redirect(url_for('.variant_page', **args))
-            else:
-                match = _regex_rsid.match(args['value'])
-                if match is not None:
-                    api_response = requests.get(f"{current_app.config['BRAVO_API_URI']}/snv?variant_id={args['value']}")
-                    if api_response.status_code == 200:
-                        payload = api_response.json()
-                        if not payload['error']:
-                            for variant in payload['data']:
-                                if any(rsid == args['value'] for rsid in variant['rsids']):
-                                    args = {
-                                       'variant_type': 'snv',
-                                       'variant_id': variant['variant_id']
-                                    }
-                                    return redirect(url_for('.variant_page', **args))
-                else:
-                    api_response = requests.get(f"{current_app.config['BRAVO_API_URI']}/genes?name={args['value']}")
-                    if api_response.status_code == 200:
-                        payload = api_response.json()
-                        if not payload['error']:
-                            for gene in payload['data']:
-                                if gene['gene_name'].upper() == args['value'].upper():
-                                    args = {
-                                       'variants_type': 'snv',
-                                       'gene_name': args['value'].upper()
-                                    }
-                                    return redirect(url_for('.gene_page', **args))
+            target = _resolve_search(f'gene:{query.value.upper()}', functools.partial(_resolve_gene_name, query.value))
+        if target is not None and target[0] is not None:
+            return redirect(url_for(target[0], **target[1]))
     return redirect(url_for('.not_found', message = f'We coudn\'t find what you wanted.'))
 
 
@@ -360,9 +517,9 @@ variant_argmap = {
 @require_authorization
 @use_kwargs(variant_argmap, location='view_args')
 def variant(variant_id):
-    api_response = requests.get(f"{current_app.config['BRAVO_API_URI']}/snv?variant_id={variant_id}&full=1", headers = { 'Accept-Encoding': 'gzip' })
+    api_response = api.get(f"/snv?variant_id={variant_id}&full=1")
     if api_response.status_code == 200:
-        return make_response(api_response.content, 200)
+        return _proxy_json(api_response)
     return not_found(f'I couldn\'t find what you wanted')
 
 
@@ -370,9 +527,9 @@ def variant(variant_id):
 @require_authorization
 @use_kwargs(variant_argmap, location='view_args')
 def variant_cram_info(variant_id):
-    api_response = requests.get(f"{current_app.config['BRAVO_API_URI']}/sequence/summary?variant_id={variant_id}")
+    api_response = api.get(f"/sequence/summary?variant_id={variant_id}")
     if api_response.status_code == 200:
-        return make_response(api_response.content, 200)
+        return _proxy_json(api_response)
     return not_found(f'I couldn\'t find what you wanted')
 
 
@@ -387,9 +544,9 @@ variant_cram_argmap = {
 @require_authorization
 @use_kwargs(variant_cram_argmap, location='view_args')
 def variant_cram(variant_id, sample_het, sample_no):
-    request_str = (f"{current_app.config['BRAVO_API_URI']}/sequence?variant_id={variant_id}"
+    request_str = (f"/sequence?variant_id={variant_id}"
                    f"&sample_no={sample_no}&heterozygous={sample_het}&index=0")
-    api_response = requests.get(request_str, headers = {'Range': request.headers['Range']}, stream = True)
+    api_response = api.get(request_str, headers = {'Range': request.headers['Range']}, stream = True)
     return Response(
        stream_with_context(api_response.iter_content(chunk_size = 1024)),
        status = api_response.status_code,
@@ -403,10 +560,10 @@ def variant_cram(variant_id, sample_het, sample_no):
 @require_authorization
 @use_kwargs(variant_cram_argmap, location='view_args')
 def variant_crai(variant_id, sample_het, sample_no):
-    request_str = (f"{current_app.config['BRAVO_API_URI']}/sequence?"
+    request_str = (f"/sequence?"
                    f"variant_id={variant_id}&sample_no={sample_no}&heterozygous={sample_het}"
                    f"&index=1")
-    api_response = requests.get(request_str, stream = True)
+    api_response = api.get(request_str, stream = True)
     return Response(
        stream_with_context(api_response.iter_content(chunk_size = 1024)),
        status = api_response.status_code,
@@ -417,9 +574,9 @@ def variant_crai(variant_id, sample_het, sample_no):
 @bp.route('/qc/api')
 @require_authorization
 def qc():
-    api_response = requests.get(f"{current_app.config['BRAVO_API_URI']}/qc", headers = { 'Accept-Encoding': 'gzip' })
+    api_response = api.get("/qc")
     if api_response.status_code == 200:
-        return make_response(api_response.content, 200)
+        return _proxy_json(api_response)
     return not_found(f'I couldn\'t find what you wanted')
 
 
@@ -434,9 +591,9 @@ genes_argmap = {
 @require_authorization
 @use_kwargs(genes_argmap, location='view_args')
 def genes(chrom, start, stop):
-    api_response = requests.get(f"{current_app.config['BRAVO_API_URI']}/genes?chrom={chrom}&start={start}&stop={stop}&full=1", headers = { 'Accept-Encoding': 'gzip' })
+    api_response = api.get(f"/genes?chrom={chrom}&start={start}&stop={stop}&full=1")
     if api_response.status_code == 200:
-        return make_response(api_response.content, 200)
+        return _proxy_json(api_response)
     return not_found(f'I couldn\'t find what you wanted')
 
 
@@ -447,9 +604,9 @@ genes_name_argmap = {
 @require_authorization
 @use_kwargs(genes_name_argmap, location='view_args')
 def genes_by_name(name):
-    api_response = requests.get(f"{current_app.config['BRAVO_API_URI']}/genes?name={name}&full=1", headers = { 'Accept-Encoding': 'gzip' })
+    api_response = api.get(f"/genes?name={name}&full=1")
     if api_response.status_code == 200:
-        return make_response(api_response.content, 200)
+        return _proxy_json(api_response)
     return not_found(f'I couldn\'t find what you wanted')
 
 
@@ -471,309 +628,409 @@ coverage_json_argmap = {
 @use_kwargs(coverage_json_argmap, location='json')
 def coverage(chrom, start, stop, size, next):
     if next is not None:
-        url = f"{current_app.config['BRAVO_API_URI']}{next}"
+        url = next
     else:
-        url = f"{current_app.config['BRAVO_API_URI']}/coverage?chrom={chrom}&start={start}&stop={stop}&limit={size}"
-    api_response = requests.get(url, headers = { 'Accept-Encoding': 'gzip' })
+        url = f"/coverage?chrom={chrom}&start={start}&stop={stop}&limit={size}"
+    api_response = api.get(url)
     if api_response.status_code == 200:
-        payload = api_response.json()
-        if not payload['error'] and payload['next'] is not None:
-            url = urllib.parse.urlparse(payload['next'])
-            url = url._replace(scheme = '', netloc = '')
-            payload['next'] = urllib.parse.urlunparse(url)
-        response = make_response(jsonify(payload), 200)
-        response.mimetype = 'application/json'
-        return response
+        return _proxy_page(api_response)
     return not_found(f'I coudn\'t find what you wanted')
 
 
+_COVERAGE_PAGE_SIZE = 10000
+
+
+coverage_all_json_argmap = {
+    'size': fields.Int(location = 'json', required = True, validate = lambda x: x > 0, error_messages = {'validation_failed': 'Value must be greater then 0'})
+}
+
+
+@bp.route('/coverage/<string:chrom>-<int:start>-<int:stop>/all', methods = ['POST'])
+@require_authorization
+@use_kwargs(coverage_route_argmap, location='view_args')
+@use_kwargs(coverage_all_json_argmap, location='json')
+def coverage_all(chrom, start, stop, size):
+    """Streams coverage of the whole region as one JSON document with the same keys as a single page and null 'next'.
+
+    Pages of `size` bins are requested from API one ahead of the one being sent, so the client needs one request
+    instead of a request per page. Meant for API clients; the bundled coverage panel pages through `coverage`.
+    """
+    url = f"/coverage?chrom={chrom}&start={start}&stop={stop}&limit={size}"
+    def generate():
+        yield '{"data":['
+        total = 0
+        error = None
+        for payload in _api_pages(url):
+            if payload['error']:
+                error = payload['error']
+                break
+            if payload['data']:
+                rows = ','.join(json.dumps(x, separators = (',', ':')) for x in payload['data'])
+                yield rows if total == 0 else ',' + rows
+                total += len(payload['data'])
+        yield f'],"total":{total},"limit":null,"next":null,"error":{json.dumps(error)}}}'
+    return Response(stream_with_context(generate()), status = 200, mimetype = 'application/json')
+
+
+class _ApiPageError(Exception):
+    """Raised when a page of a multi-page API response has an error."""
+
+
+coverage_binned_argmap = {
+    'width': fields.Int(required = True, validate = lambda x: 0 < x <= 20000, error_messages = {'validator_failed': 'Value must be between 1 and 20000.'})
+}
+
+
+@bp.route('/coverage/<string:chrom>-<int:start>-<int:stop>/binned', methods = ['GET'])
+@require_authorization
+@use_kwargs(coverage_route_argmap, location='view_args')
+@use_kwargs(coverage_binned_argmap, location='query')
+def coverage_binned(chrom, start, stop, width):
+    """Returns coverage of the region aggregated into at most `width` bins (e.g. plot width in pixels).
+
+    Results are kept in the response cache per region and width.
+    """
+    if start > stop:
+        return make_response(jsonify({ 'data': None, 'error': 'Start must not be greater than stop.' }), 422)
+    key = f'/coverage/binned?chrom={chrom}&start={start}&stop={stop}&width={width}'
+    cache_ttl = api.cache_ttl()
+    cached_response = cache.get(key) if cache_ttl else None
+    if cached_response is not None:
+        return _proxy_json(cached_response)
+    def rows():
+        for payload in _api_pages(f"/coverage?chrom={chrom}&start={start}&stop={stop}&limit={_COVERAGE_PAGE_SIZE}"):
+            if payload['error']:
+                raise _ApiPageError(payload['error'])
+            yield from payload['data']
+    try:
+        bins = downsample(rows(), start, stop, width)  # rows are aggregated page by page, as they arrive
+    except _ApiPageError:
+        return not_found(f'I coudn\'t find what you wanted')
+    content = json.dumps({ 'data': bins, 'total': len(bins), 'limit': None, 'next': None, 'error': None }, separators = (',', ':')).encode()
+    buffered_response = BufferedResponse(200, { 'Content-Type': 'application/json' }, content)
+    if cache_ttl:
+        cache.set(key, buffered_response, cache_ttl)
+    return _proxy_json(buffered_response)
+
+
 @bp.route('/variants/<string:variants_type>', methods = ['POST', 'GET'])
 @require_authorization
 def variants_meta(variants_type):
-    url = f"{current_app.config['BRAVO_API_URI']}/{variants_type}/filters"
-    api_response = requests.get(url)
+    url = f"/{variants_type}/filters"
+    api_response = api.get(url)
     if api_response.status_code == 200:
-        payload = api_response.json()
-        return make_response(jsonify(payload), 200)
+        return _proxy_json(api_response)
     return render_template('not_found.html', show_brand = True, message = "Bad query!"), 404
 
 
+def _params():
+    return request.get_json() if request.method == 'POST' else None
+
+
+def _with_args(url, args):
+    return f"{url}&{'&'.join(args)}" if args else url
+
+
+@bp.errorhandler(filters.FilterError)
+def filter_error(e):
+    return make_response(jsonify({ 'data': None, 'error': str(e) }), 422)
+
+
 @bp.route('/variants/region/<string:variants_type>/<string:chrom>-<int:start>-<int:stop>/histogram', methods = ['POST', 'GET'])
 @require_authorization
 def region_variants_histogram(variants_type, chrom, start, stop):
-    sort = []
-    args = []
-    size = None
-    url = None
-
-    filter_type = {
-       '=': 'eq',
-       '!=': 'ne',
-       '<': 'lt',
-       '>': 'gt',
-       '<=': 'lte',
-       '>=': 'gte'
-    }
-
-    if request.method == 'POST':
-        params = request.get_json()
-        if params:
-            for f in params.get('filters', []):
-                if isinstance(f, list):
-                    if len(f) > 0 and len(set( x["field"] for x in f )) == 1:
-                        args.append('{}={}'.format(f[0]['field'], ','.join(f'{filter_type.get(x["type"], "eq")}:{x["value"]}' for x in f)))
-                else:
-                    args.append(f'{f["field"]}={filter_type.get(f["type"], "eq")}:{f["value"]}')
-            if 'windows' in params:
-                args.append(f'windows={params["windows"]}')
-
-    url = f"{current_app.config['BRAVO_API_URI']}/region/{variants_type}/histogram?chrom={chrom}&start={start}&stop={stop}"
-    if args:
-        url += f"&{'&'.join(args)}"
+    args = filters.query_args(variants_type, _params(), extra = ('windows',))
+    url = _with_args(f"/region/{variants_type}/histogram?chrom={chrom}&start={start}&stop={stop}", args)
 
     print(url)
 
-    api_response = requests.get(url)
+    api_response = api.get(url)
     if api_response.status_code == 200:
-        payload = api_response.json()
-        return make_response(jsonify(payload), 200)
+        return _proxy_json(api_response)
     return render_template('not_found.html', show_brand = True, message = "Bad query!"), 404
 
 
 @bp.route('/variants/region/<string:variants_type>/<string:chrom>-<int:start>-<int:stop>/summary', methods = ['POST', 'GET'])
 @require_authorization
 def region_variants_summary(variants_type, chrom, start, stop):
-    args = []
-    url = None
+    args = filters.query_args(variants_type, _params())
+    url = _with_args(f"/region/{variants_type}/summary?chrom={chrom}&start={start}&stop={stop}", args)
 
-    filter_type = {
-       '=': 'eq',
-       '!=': 'ne',
-       '<': 'lt',
-       '>': 'gt',
-       '<=': 'lte',
-       '>=': 'gte'
-    }
-
-    if request.method == 'POST':
-        params = request.get_json()
-        if params:
-            for f in params.get('filters', []):
-                if isinstance(f, list):
-                    if len(f) > 0 and len(set( x["field"] for x in f )) == 1:
-                        args.append('{}={}'.format(f[0]['field'], ','.join(f'{filter_type.get(x["type"], "eq")}:{x["value"]}' for x in f)))
-                else:
-                    args.append(f'{f["field"]}={filter_type.get(f["type"], "eq")}:{f["value"]}')
-
-    url = f"{current_app.config['BRAVO_API_URI']}/region/{variants_type}/summary?chrom={chrom}&start={start}&stop={stop}"
-    if args:
-        url += f"&{'&'.join(args)}"
-
-    api_response = requests.get(url)
+    api_response = api.get(url)
     if api_response.status_code == 200:
-        payload = api_response.json()
-        return make_response(jsonify(payload), 200)
+        return _proxy_json(api_response)
     return render_template('not_found.html', show_brand = True, message = "Bad query!"), 404
 
 
 @bp.route('/variants/gene/<string:variants_type>/<string:gene_name>/summary', methods = ['POST', 'GET'])
 @require_authorization
 def gene_variants_summary(variants_type, gene_name):
-    args = []
-    url = None
-
-    filter_type = {
-       '=': 'eq',
-       '!=': 'ne',
-       '<': 'lt',
-       '>': 'gt',
-       '<=': 'lte',
-       '>=': 'gte'
-    }
+    args = filters.query_args(variants_type, _params(), extra = ('introns',))
+    url = _with_args(f"/gene/{variants_type}/summary?name={gene_name}", args)
 
-    if request.method == 'POST':
-        params = request.get_json()
-        if params:
-            # print('gene summary params = ', params)
-            for f in params.get('filters', []):
-                if isinstance(f, list):
-                    if len(f) > 0 and len(set( x["field"] for x in f )) == 1:
-                        args.append('{}={}'.format(f[0]['field'], ','.join(f'{filter_type.get(x["type"], "eq")}:{x["value"]}' for x in f)))
-                else:
-                    args.append(f'{f["field"]}={filter_type.get(f["type"], "eq")}:{f["value"]}')
-            if 'introns' in params:
-                args.append(f'introns={params["introns"]}')
-
-    url = f"{current_app.config['BRAVO_API_URI']}/gene/{variants_type}/summary?name={gene_name}"
-    if args:
-        url += f"&{'&'.join(args)}"
-
-    api_response = requests.get(url)
+    api_response = api.get(url)
     if api_response.status_code == 200:
-        payload = api_response.json()
-        return make_response(jsonify(payload), 200)
+        return _proxy_json(api_response)
     return render_template('not_found.html', show_brand = True, message = "Bad query!"), 404
 
 
 @bp.route('/variants/gene/<string:variants_type>/<string:gene_name>/histogram', methods = ['POST', 'GET'])
 @require_authorization
 def gene_variants_histogram(variants_type, gene_name):
-    sort = []
-    args = []
-    size = None
-    url = None
-
-    filter_type = {
-       '=': 'eq',
-       '!=': 'ne',
-       '<': 'lt',
-       '>': 'gt',
-       '<=': 'lte',
-       '>=': 'gte'
-    }
-
-    if request.method == 'POST':
-        params = request.get_json()
-        if params:
-            print('gene histogram params = ', params)
-            for f in params.get('filters', []):
-                if isinstance(f, list):
-                    if len(f) > 0 and len(set( x["field"] for x in f )) == 1:
-                        args.append('{}={}'.format(f[0]['field'], ','.join(f'{filter_type.get(x["type"], "eq")}:{x["value"]}' for x in f)))
-                else:
-                    args.append(f'{f["field"]}={filter_type.get(f["type"], "eq")}:{f["value"]}')
-            if 'windows' in params:
-                args.append(f'windows={params["windows"]}')
-            if 'introns' in params:
-                args.append(f'introns={params["introns"]}')
-
-    url = f"{current_app.config['BRAVO_API_URI']}/gene/{variants_type}/histogram?name={gene_name}"
-    if args:
-        url += f"&{'&'.join(args)}"
+    args = filters.query_args(variants_type, _params(), extra = ('windows', 'introns'))
+    url = _with_args(f"/gene/{variants_type}/histogram?name={gene_name}", args)
 
     print(url)
 
-    api_response = requests.get(url)
+    api_response = api.get(url)
     if api_response.status_code == 200:
-        payload = api_response.json()
-        return make_response(jsonify(payload), 200)
+        return _proxy_json(api_response)
     return render_template('not_found.html', show_brand = True, message = "Bad query!"), 404
 
 
+def _variants_url(variants_type, url, params, introns = False):
+    """Returns API URL of variants page for JSON parameters posted by variants table.
+
+    Arguments:
+    variants_type -- 'snv' or 'sv'.
+    url -- API URL of all variants in region or gene, e.g. '/region/snv?chrom=22&start=100&stop=200'.
+    params -- posted JSON parameters (filters, sorters, size, next) or None.
+    introns -- True if 'introns' parameter is supported.
+    """
+    if not params:
+        return url
+    if params.get('next', None) is not None:
+        return params['next']
+    args = []
+    if 'size' in params:
+        args.append(f"limit={int(params['size'])}")
+    args.extend(filters.query_args(variants_type, params, extra = ('introns',) if introns else ()))
+    sort = [ f'{s["field"]}:{s["dir"]}' for s in params.get('sorters', []) ]
+    if sort:
+        args.append(f"sort={','.join(sort)}")
+    return _with_args(url, args)
+
+
+def _api_path(url):
+    """Returns path with query string of API URL, i.e. removes scheme and host."""
+    url = urllib.parse.urlsplit(url)
+    return urllib.parse.urlunsplit(('', '', url.path, url.query, ''))
+
+
+def _api_pages(url):
+    """Yields JSON payloads of all pages, following API's 'next' cursor.
+
+    Next page is requested as soon as its cursor is known, while the caller processes the current page.
+    So, at most two pages are held in memory. Failed API call or non-200 API response is yielded as payload with 'error'.
+    """
+    future = api.submit(url, cache_ttl = 0)
+    while future is not None:
+        try:
+            api_response = future.result()
+        except requests.exceptions.RequestException:
+            yield { 'data': None, 'next': None, 'error': 'BRAVO API is not available.' }
+            return
+        future = None
+        if api_response.status_code != 200:
+            yield { 'data': None, 'next': None, 'error': f'BRAVO API returned status code {api_response.status_code}.' }
+            return
+        payload = api_response.json()
+        if not payload.get('error', None) and payload.get('next', None) is not None:
+            future = api.submit(_api_path(payload['next']), cache_ttl = 0)
+        yield payload
+
+
+_regex_next = re.compile(rb'"next"\s*:\s*"([^"\\]+)"')
+
+
+def _get_page(url):
+    """Returns API page of variants and its decompressed content (None if the call failed), and prefetches the next page in background.
+
+    Pages are prefetched per user session, so a click on the next page is served from memory (or joins the
+    prefetch, if it is still in flight). The session gets a prefetch ID only when the first prefetch starts.
+    """
+    owner = session.get('_prefetch_id', None)
+    api_response = api.prefetched(url, owner) if owner is not None else None
+    if api_response is None:
+        api_response = api.get(url)
+    if api_response.status_code != 200:
+        return api_response, None
+    content = api_response.content
+    match = _regex_next.match(content, max(content.rfind(b'"next"'), 0))
+    if match is not None and current_app.config['BRAVO_API_PREFETCH_TTL']:
+        if owner is None:
+            owner = session['_prefetch_id'] = uuid.uuid4().hex
+        api.prefetch(_api_path(match.group(1).decode('utf-8')), owner)
+    return api_response, content
+
+
+def _stream_variants(url):
+    """Streams all variants as newline-delimited JSON. Error, if any, is sent as the last line: {"error": "..."}.
+
+    Meant for clients which need all variants at once (e.g. scripts and exports). The bundled variants table loads
+    pages on scroll through the paged views instead.
+    """
+    def generate():
+        for payload in _api_pages(url):
+            if payload['error']:
+                yield json.dumps({ 'error': payload['error'] }) + '\n'
+                return
+            if payload['data']:
+                yield ''.join(json.dumps(variant, separators = (',', ':')) + '\n' for variant in payload['data'])
+    return Response(stream_with_context(generate()), status = 200, mimetype = 'application/x-ndjson')
+
+
 @bp.route('/variants/region/<string:variants_type>/<string:chrom>-<int:start>-<int:stop>', methods = ['POST', 'GET'])
 @require_authorization
 def variants(variants_type, chrom, start, stop):
-    sort = []
-    args = []
-    size = None
-    url = None
-
-    filter_type = {
-       '=': 'eq',
-       '!=': 'ne',
-       '<': 'lt',
-       '>': 'gt',
-       '<=': 'lte',
-       '>=': 'gte'
-    }
-
+    url = f"/region/{variants_type}?chrom={chrom}&start={start}&stop={stop}"
     if request.method == 'POST':
-        params = request.get_json()
-        if params:
-            if 'next' in params and params['next'] is not None:
-                url = params['next']
-            if 'size' in params:
-                size = int(params['size'])
-            for f in params.get('filters', []):
-                if isinstance(f, list):
-                    if len(f) > 0 and len(set( x["field"] for x in f )) == 1:
-                        args.append('{}={}'.format(f[0]['field'], ','.join(f'{filter_type.get(x["type"], "eq")}:{x["value"]}' for x in f)))
-                else:
-                    args.append(f'{f["field"]}={filter_type.get(f["type"], "eq")}:{f["value"]}')
-            for s in params.get('sorters', []):
-                sort.append(f'{s["field"]}:{s["dir"]}')
-
-    if url is not None:
-        url = f"{current_app.config['BRAVO_API_URI']}{url}"
-    else:
-        url = f"{current_app.config['BRAVO_API_URI']}/region/{variants_type}?chrom={chrom}&start={start}&stop={stop}"
-        if size:
-            url += f'&limit={size}'
-        if args:
-            url += f"&{'&'.join(args)}"
-        if sort:
-            url += f"&sort={','.join(sort)}"
+        url = _variants_url(variants_type, url, request.get_json())
 
     print(url)
 
-    api_response = requests.get(url)
+    api_response, content = _get_page(url)
     if api_response.status_code == 200:
-        payload = api_response.json()
-        if not payload['error'] and payload['next'] is not None:
-            # remove host url because we don't want to expose what is our api endpoint
-            url = urllib.parse.urlparse(payload['next'])
-            url = url._replace(scheme = '', netloc = '')
-            payload['next'] = urllib.parse.urlunparse(url)
-        return make_response(jsonify(payload), 200)
+        return _proxy_page(api_response, content)
     return render_template('not_found.html', show_brand = True, message = "Bad query!"), 404
 
 
+@bp.route('/variants/region/<string:variants_type>/<string:chrom>-<int:start>-<int:stop>/stream', methods = ['POST', 'GET'])
+@require_authorization
+def variants_stream(variants_type, chrom, start, stop):
+    url = f"/region/{variants_type}?chrom={chrom}&start={start}&stop={stop}"
+    if request.method == 'POST':
+        url = _variants_url(variants_type, url, request.get_json())
+    return _stream_variants(url)
+
+
 @bp.route('/variants/gene/<string:variants_type>/<string:gene_name>', methods = ['POST', 'GET'])
 @require_authorization
 def gene_variants(variants_type, gene_name):
-    sort = []
-    args = []
-    size = None
-    url = None
-
-    filter_type = {
-       '=': 'eq',
-       '!=': 'ne',
-       '<': 'lt',
-       '>': 'gt',
-       '<=': 'lte',
-       '>=': 'gte'
-    }
-
+    url = f"/gene/{variants_type}?name={gene_name}"
     if request.method == 'POST':
-        params = request.get_json()
-        if params:
-            print('params from browser = ', params)
-            if 'next' in params and params['next'] is not None:
-                url = params['next']
-            if 'size' in params:
-                size = int(params['size'])
-            if 'introns' in params:
-                args.append(f'introns={params["introns"]}')
-            for f in params.get('filters', []):
-                if isinstance(f, list):
-                    if len(f) > 0 and len(set( x["field"] for x in f )) == 1:
-                        args.append('{}={}'.format(f[0]['field'], ','.join(f'{filter_type.get(x["type"], "eq")}:{x["value"]}' for x in f)))
-                else:
-                    args.append(f'{f["field"]}={filter_type.get(f["type"], "eq")}:{f["value"]}')
-            for s in params.get('sorters', []):
-                sort.append(f'{s["field"]}:{s["dir"]}')
-
-    if url is not None:
-        url = f"{current_app.config['BRAVO_API_URI']}{url}"
-    else:
-        url = f"{current_app.config['BRAVO_API_URI']}/gene/{variants_type}?name={gene_name}"
-        if size:
-            url += f'&limit={size}'
-        if args:
-            url += f"&{'&'.join(args)}"
-        if sort:
-            url += f"&sort={','.join(sort)}"
+        url = _variants_url(variants_type, url, request.get_json(), introns = True)
 
     print('url to API = ', url)
 
-    api_response = requests.get(url)
+    api_response, content = _get_page(url)
     if api_response.status_code == 200:
-        payload = api_response.json()
-        if not payload['error'] and payload['next'] is not None:
-            # remove host url because we don't want to expose what is our api endpoint
-            url = urllib.parse.urlparse(payload['next'])
-            url = url._replace(scheme = '', netloc = '')
-            payload['next'] = urllib.parse.urlunparse(url)
-        return make_response(jsonify(payload), 200)
+        return _proxy_page(api_response, content)
     return render_template('not_found.html', show_brand = True, message = "Bad query!"), 404
+
+
+@bp.route('/variants/gene/<string:variants_type>/<string:gene_name>/stream', methods = ['POST', 'GET'])
+@require_authorization
+def gene_variants_stream(variants_type, gene_name):
+    url = f"/gene/{variants_type}?name={gene_name}"
+    if request.method == 'POST':
+        url = _variants_url(variants_type, url, request.get_json(), introns = True)
+    return _stream_variants(url)
+
+
+def _batch_error(message):
+    abort(make_response(jsonify({ 'data': None, 'error': message }), 422))
+
+
+def _batch_coverage_path(chrom, start, stop, params):
+    size = params.get('size', _COVERAGE_PAGE_SIZE)
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        _batch_error('Coverage size must be greater than 0.')
+    return f"/coverage?chrom={chrom}&start={int(start)}&stop={int(stop)}&limit={size}"
+
+
+def _region_batch_query(variants_type, chrom, start, stop, panel, params):
+    """Returns name of the equivalent view and API path for the region page panel."""
+    region = f"chrom={chrom}&start={start}&stop={stop}"
+    if panel == 'summary':
+        return 'region_variants_summary', _with_args(f"/region/{variants_type}/summary?{region}", filters.query_args(variants_type, params))
+    if panel == 'histogram':
+        return 'region_variants_histogram', _with_args(f"/region/{variants_type}/histogram?{region}", filters.query_args(variants_type, params, extra = ('windows',)))
+    if panel == 'genes':
+        return 'genes', f"/genes?{region}&full=1"
+    if panel == 'variants':
+        return 'variants', _variants_url(variants_type, f"/region/{variants_type}?{region}", params)
+    if panel == 'coverage':
+        return 'coverage', _batch_coverage_path(chrom, start, stop, params)
+    if panel == 'filters':
+        return 'variants_meta', f"/{variants_type}/filters"
+    _batch_error(f'Unknown panel {panel!r}.')
+
+
+def _gene_batch_query(variants_type, gene_name, panel, params):
+    """Returns name of the equivalent view and API path for the gene page panel."""
+    if panel == 'summary':
+        return 'gene_variants_summary', _with_args(f"/gene/{variants_type}/summary?name={gene_name}", filters.query_args(variants_type, params, extra = ('introns',)))
+    if panel == 'histogram':
+        return 'gene_variants_histogram', _with_args(f"/gene/{variants_type}/histogram?name={gene_name}", filters.query_args(variants_type, params, extra = ('windows', 'introns')))
+    if panel == 'genes':
+        return 'genes_by_name', f"/genes?name={gene_name}&full=1"
+    if panel == 'variants':
+        return 'gene_variants', _variants_url(variants_type, f"/gene/{variants_type}?name={gene_name}", params, introns = True)
+    if panel == 'coverage':
+        # Gene coordinates are not known before the gene lookup, so the client passes them.
+        if not all(isinstance(params.get(x, None), int) for x in ('start', 'stop')) or not params.get('chrom', None):
+            _batch_error('Coverage of gene requires "chrom", "start" and "stop".')
+        return 'coverage', _batch_coverage_path(urllib.parse.quote(str(params['chrom']), safe = ''), params['start'], params['stop'], params)
+    if panel == 'filters':
+        return 'variants_meta', f"/{variants_type}/filters"
+    _batch_error(f'Unknown panel {panel!r}.')
+
+
+def _batch_content(panel, future):
+    """Returns payload of the panel's API call. A failed call is reported in the panel's payload, so other panels are still sent."""
+    try:
+        api_response = future.result()
+    except requests.exceptions.RequestException:
+        return json.dumps({ 'data': None, 'error': 'BRAVO API is not available.' }).encode()
+    if api_response.status_code != 200:
+        return json.dumps({ 'data': None, 'error': f'BRAVO API returned status code {api_response.status_code}.' }).encode()
+    if panel in ('variants', 'coverage'):
+        return _strip_next_origin(api_response.content)
+    return api_response.content
+
+
+def _batch(query):
+    """Runs all panel queries posted as {"<panel>": {<parameters>}, ...} concurrently against API.
+
+    Sub-queries use the timeouts and response cache settings of their equivalent views. By default, responds with
+    one JSON object {"<panel>": <payload>, ...}. If client explicitly accepts multipart/mixed, then every payload is
+    streamed as a separate part (with panel name in Content-ID) as soon as it is ready. Meant for API clients which
+    render several panels at once; the bundled web components query every panel through its own view.
+    """
+    queries = request.get_json(silent = True)
+    if not isinstance(queries, dict) or not queries:
+        _batch_error('Expected JSON object with parameters by panel.')
+    paths = []
+    for panel, params in queries.items():
+        if params is not None and not isinstance(params, dict):
+            _batch_error(f'Parameters of panel {panel!r} must be JSON object.')
+        paths.append((panel, *query(panel, params or {})))
+    futures = { api.submit(path, timeout = api.timeout(view), cache_ttl = api.cache_ttl(view)): panel for panel, view, path in paths }
+    if 'multipart/mixed' in request.accept_mimetypes.values():
+        boundary = uuid.uuid4().hex
+        def generate():
+            for future in concurrent.futures.as_completed(futures):
+                panel = futures[future]
+                yield (f'--{boundary}\r\nContent-Type: application/json\r\nContent-ID: <{panel}>\r\n\r\n').encode()
+                yield _batch_content(panel, future) + b'\r\n'
+            yield f'--{boundary}--\r\n'.encode()
+        response = Response(stream_with_context(generate()), status = 200, content_type = f'multipart/mixed; boundary={boundary}')
+        response.vary.add('Accept')
+        return response
+    content = b','.join(json.dumps(panel).encode() + b':' + _batch_content(panel, future) for future, panel in futures.items())
+    response = Response(b'{' + content + b'}', status = 200, mimetype = 'application/json')
+    response.vary.add('Accept')
+    return response
+
+
+@bp.route('/batch/region/<string:variants_type>/<string:chrom>-<int:start>-<int:stop>', methods = ['POST'])
+@require_authorization
+def region_batch(variants_type, chrom, start, stop):
+    return _batch(functools.partial(_region_batch_query, variants_type, chrom, start, stop))
+
+
+@bp.route('/batch/gene/<string:variants_type>/<string:gene_name>', methods = ['POST'])
+@require_authorization
+def gene_batch(variants_type, gene_name):
+    return _batch(functools.partial(_gene_batch_query, variants_type, gene_name))
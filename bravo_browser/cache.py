@@ -0,0 +1,293 @@
+from collections import OrderedDict
+import urllib.parse
+import threading
+import hashlib
+import logging
+import pickle
+import time
+import os
+
+
+def normalize_url(path):
+    """Returns API path with sorted query arguments, so equivalent queries map to the same key."""
+    url = urllib.parse.urlsplit(path)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(url.query, keep_blank_values = True)))
+    return urllib.parse.urlunsplit(('', '', url.path, query, ''))
+
+
+class MemoryBackend(object):
+    """Per-worker LRU bounded by number of entries and total size of values in bytes."""
+
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _sizeof(value):
+        body = getattr(value, 'body', None)
+        return len(body) if body is not None else 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, size, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self._bytes -= size
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, size, _) = self._entries.popitem(last = False)
+                self._bytes -= size
+
+    def delete(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._bytes -= entry[1]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskBackend(object):
+    """Cache shared by all workers on the host. Entries are pickled into files named by key hash.
+
+    Least recently used files (by modification time, which is refreshed on hit) are evicted when the
+    number of files exceeds `max_entries`.
+    """
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._n_sets = 0
+        os.makedirs(directory, exist_ok = True)
+
+    def _filename(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        filename = self._filename(key)
+        try:
+            with open(filename, 'rb') as ifile:
+                expires, value = pickle.load(ifile)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        if expires < time.time():
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(filename)
+        except OSError:
+            pass
+        return value
+
+    def set(self, key, value, ttl):
+        filename = self._filename(key)
+        tmp_filename = f'{filename}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_filename, 'wb') as ofile:
+                pickle.dump((time.time() + ttl, value), ofile, protocol = pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_filename, filename)
+        except OSError:
+            try:
+                os.remove(tmp_filename)  # e.g. partially written file when disk is full
+            except OSError:
+                pass
+            raise
+        self._n_sets += 1
+        if self._n_sets % 100 == 0:
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+        if len(entries) > self.max_entries:
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def __len__(self):
+        return sum(1 for name in os.listdir(self.directory) if not name.endswith('.tmp'))
+
+
+class RedisBackend(object):
+    """Cache shared by all workers and hosts. Works with any Redis-compatible server."""
+
+    def __init__(self, url, prefix = 'bravo_ui:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('BRAVO_API_CACHE_BACKEND = "redis" requires the "redis" package.')
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        return pickle.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.setex(self.prefix + key, max(1, int(ttl)), pickle.dumps(value, protocol = pickle.HIGHEST_PROTOCOL))
+
+    def __len__(self):
+        return sum(1 for _ in self._client.scan_iter(match = self.prefix + '*'))
+
+
+class ResponseCache(object):
+    """Cache for BRAVO API responses which don't change within a dataset release.
+
+    Keys are normalized API URLs. Routes (i.e. view function names) are cached only if they are listed in
+    BRAVO_API_CACHE_TTLS with their time-to-live in seconds.
+
+    The cache fails open: backend errors (e.g. Redis is down, disk is full) are logged and counted as misses,
+    so views call the API instead of failing.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('BRAVO_API_CACHE_BACKEND', 'memory')
+        app.config.setdefault('BRAVO_API_CACHE_MAX_ENTRIES', 1000)
+        app.config.setdefault('BRAVO_API_CACHE_MAX_BYTES', 64 * 1024 * 1024)
+        app.config.setdefault('BRAVO_API_CACHE_DIR', os.path.join(app.instance_path, 'api_cache'))
+        app.config.setdefault('BRAVO_API_CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('BRAVO_API_CACHE_TTLS', {
+            'genes': 86400,
+            'genes_by_name': 86400,
+            'variant': 86400,
+            'variant_cram_info': 86400,
+            'qc': 86400,
+            'variants_meta': 86400,
+            'coverage_binned': 86400
+        })
+        backend = app.config['BRAVO_API_CACHE_BACKEND']
+        if backend == 'memory':
+            self.backend = MemoryBackend(app.config['BRAVO_API_CACHE_MAX_ENTRIES'], app.config['BRAVO_API_CACHE_MAX_BYTES'])
+        elif backend == 'disk':
+            self.backend = DiskBackend(app.config['BRAVO_API_CACHE_DIR'], app.config['BRAVO_API_CACHE_MAX_ENTRIES'])
+        elif backend == 'redis':
+            self.backend = RedisBackend(app.config['BRAVO_API_CACHE_REDIS_URL'])
+        elif backend is None:
+            self.backend = None
+        else:
+            raise ValueError(f'Unknown BRAVO_API_CACHE_BACKEND "{backend}".')
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        app.extensions['bravo_api_cache'] = self
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def _error(self, operation, key, e):
+        self.errors += 1
+        logging.getLogger(__name__).warning(f'Response cache {operation} of {key} failed: {e!r}')
+
+    def get(self, key):
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            self._error('get', key, e)
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl):
+        try:
+            self.backend.set(key, value, ttl)
+        except Exception as e:
+            self._error('set', key, e)
+
+    def stats(self):
+        return { 'hits': self.hits, 'misses': self.misses, 'errors': self.errors, 'entries': len(self.backend) if self.enabled else 0 }
+
+
+cache = ResponseCache()
+
+
+class PrefixCache(object):
+    """Per-worker LRU of type-ahead results by query.
+
+    A query which is not cached can be answered from the cached result of its longest cached prefix, if that
+    result was complete (i.e. not truncated), by narrowing it down locally.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('AUTOCOMPLETE_CACHE_MAX_ENTRIES', 10000)
+        app.config.setdefault('AUTOCOMPLETE_CACHE_TTL', 3600)
+        self.ttl = app.config['AUTOCOMPLETE_CACHE_TTL']
+        self.backend = MemoryBackend(app.config['AUTOCOMPLETE_CACHE_MAX_ENTRIES'], float('inf')) if self.ttl else None
+
+    def get(self, query, narrow):
+        """Returns cached result of the query or None.
+
+        Arguments:
+        query -- query string.
+        narrow -- function (result, prefix, query) which returns complete result of prefix narrowed down to the query or None if it can't.
+        """
+        if self.backend is None:
+            return None
+        entry = self.backend.get(query)
+        if entry is not None:
+            return entry[0]
+        for i in range(len(query) - 1, 0, -1):
+            entry = self.backend.get(query[:i])
+            if entry is None:
+                continue
+            result, complete = entry
+            if not complete:
+                continue
+            result = narrow(result, query[:i], query)
+            if result is not None:
+                self.backend.set(query, (result, True), self.ttl)
+            return result
+        return None
+
+    def set(self, query, result, complete):
+        if self.backend is not None:
+            self.backend.set(query, (result, complete), self.ttl)
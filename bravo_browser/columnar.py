@@ -0,0 +1,96 @@
+"""Columnar binary encoding of API pages (coverage bins, variants).
+
+Layout (all integers little-endian):
+
+    b'BRVC' | header length H (uint32) | header (H bytes of UTF-8 JSON) | column buffers
+
+The header is {"n": <number of rows>, "columns": [{"name", "type", "offset", "length"}, ...], "meta": {...}}, where
+"meta" holds all payload keys except "data" (e.g. "next", "total", "error"). Column offsets are relative to the end
+of the header and are 8-byte aligned, so numeric columns map directly onto typed arrays in the browser:
+
+    "int32"   -- Int32Array(buffer, 8 + H + offset, n)
+    "float64" -- Float64Array(buffer, 8 + H + offset, n); missing values are NaN
+    "json"    -- JSON.parse(TextDecoder.decode(...)) gives array of n values (strings, lists, objects, booleans)
+"""
+from array import array
+import struct
+import json
+import math
+import sys
+
+
+MIMETYPE = 'application/vnd.bravo.columnar'
+MAGIC = b'BRVC'
+
+_INT32_MIN = -2**31
+_INT32_MAX = 2**31 - 1
+
+
+def _column_type(values):
+    is_int = True
+    has_none = False
+    for value in values:
+        if value is None:
+            has_none = True
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            return 'json'
+        elif is_int and (isinstance(value, float) or value < _INT32_MIN or value > _INT32_MAX):
+            is_int = False
+    return 'int32' if is_int and not has_none else 'float64'
+
+
+def _typed_bytes(typecode, values):
+    buffer = array(typecode, values)
+    if sys.byteorder != 'little':
+        buffer.byteswap()
+    return buffer.tobytes()
+
+
+def encode(payload):
+    """Encodes JSON payload with list of rows in 'data' into columnar binary format."""
+    rows = payload.get('data', None) or []
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    columns = []
+    buffers = []
+    offset = 0
+    for name in names:
+        values = [ row.get(name, None) for row in rows ]
+        column_type = _column_type(values)
+        if column_type == 'int32':
+            buffer = _typed_bytes('i', values)
+        elif column_type == 'float64':
+            buffer = _typed_bytes('d', [ math.nan if x is None else x for x in values ])
+        else:
+            buffer = json.dumps(values, separators = (',', ':')).encode('utf-8')
+        columns.append({ 'name': name, 'type': column_type, 'offset': offset, 'length': len(buffer) })
+        padding = -len(buffer) % 8
+        buffers.append(buffer + b'\0' * padding)
+        offset += len(buffer) + padding
+    meta = { key: value for key, value in payload.items() if key != 'data' }
+    header = json.dumps({ 'n': len(rows), 'columns': columns, 'meta': meta }, separators = (',', ':')).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 4 + len(header)) % 8)
+    return b''.join([ MAGIC, struct.pack('<I', len(header)), header ] + buffers)
+
+
+def decode(content):
+    """Decodes columnar binary format into JSON payload with list of rows in 'data'."""
+    if content[:4] != MAGIC:
+        raise ValueError('Not a columnar payload.')
+    header_length, = struct.unpack_from('<I', content, 4)
+    start = 8 + header_length
+    header = json.loads(content[8:start])
+    n = header['n']
+    columns = {}
+    for column in header['columns']:
+        buffer = content[start + column['offset']:start + column['offset'] + column['length']]
+        if column['type'] == 'json':
+            columns[column['name']] = json.loads(buffer)
+        else:
+            values = array('i' if column['type'] == 'int32' else 'd')
+            values.frombytes(buffer)
+            if sys.byteorder != 'little':
+                values.byteswap()
+            columns[column['name']] = values.tolist()
+    payload = dict(header['meta'])
+    payload['data'] = [ { name: values[i] for name, values in columns.items() } for i in range(n) ]
+    return payload
@@ -0,0 +1,252 @@
+from flask import current_app, request, send_from_directory
+from flask.cli import with_appcontext
+from flask.helpers import safe_join
+import flask_compress
+import functools
+import mimetypes
+import hashlib
+import brotli
+import click
+import gzip
+import zlib
+import sys
+import os
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional
+    zstandard = None
+
+
+# Precompressed siblings of static files, in the order of server preference.
+STATIC_ENCODINGS = [('zstd', '.zst'), ('br', '.br'), ('gzip', '.gz')]
+STATIC_COMPRESSIBLE = ('.js', '.css', '.map', '.json', '.svg', '.txt', '.html', '.ico')
+
+
+def available_algorithms():
+    return ['zstd', 'br', 'gzip'] if zstandard is not None else ['br', 'gzip']
+
+
+def compress_file(filename, encodings):
+    """Writes precompressed siblings of the file if they don't exist or are older than the file.
+
+    Returns number of written files.
+    """
+    n_written = 0
+    mtime = os.path.getmtime(filename)
+    data = None
+    for encoding, suffix in STATIC_ENCODINGS:
+        if encoding not in encodings:
+            continue
+        compressed_filename = filename + suffix
+        if os.path.isfile(compressed_filename) and os.path.getmtime(compressed_filename) >= mtime:
+            continue
+        if data is None:
+            with open(filename, 'rb') as ifile:
+                data = ifile.read()
+        if encoding == 'gzip':
+            compressed = gzip.compress(data, compresslevel = 9, mtime = 0)
+        elif encoding == 'br':
+            compressed = brotli.compress(data, quality = 11)
+        else:
+            compressed = zstandard.ZstdCompressor(level = 19).compress(data)
+        tmp_filename = f'{compressed_filename}.{os.getpid()}.tmp'
+        with open(tmp_filename, 'wb') as ofile:
+            ofile.write(compressed)
+        os.replace(tmp_filename, compressed_filename)
+        n_written += 1
+    return n_written
+
+
+def compress_directory(directory, encodings):
+    """Writes precompressed siblings for all compressible files in the directory. Returns number of written files."""
+    n_written = 0
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.endswith(STATIC_COMPRESSIBLE):
+                n_written += compress_file(os.path.join(root, filename), encodings)
+    return n_written
+
+
+def static_folders(app):
+    folders = []
+    if app.has_static_folder:
+        folders.append(app.static_folder)
+    for blueprint in app.blueprints.values():
+        if blueprint.has_static_folder and blueprint.static_folder not in folders:
+            folders.append(blueprint.static_folder)
+    return folders
+
+
+class Compress(flask_compress.Compress):
+    """Flask-Compress with zstd support and precompressed static files.
+
+    JSON responses are compressed with the best of zstd (if zstandard package is installed), br and gzip accepted
+    by the client. Streamed responses are compressed on the fly. Static files are served from their precompressed .zst/.br/.gz siblings (see `compress-static`
+    command) with strong content-hash ETags and long-lived Cache-Control. URLs of static files get the content
+    hash as `v` query argument, so browsers fetch new version after deployment.
+    """
+
+    def __init__(self, app=None):
+        self._digests = {}
+        super().__init__(app)
+
+    def init_app(self, app):
+        app.config.setdefault('COMPRESS_ALGORITHM', available_algorithms())
+        app.config.setdefault('COMPRESS_ZSTD_LEVEL', 3)
+        app.config.setdefault('COMPRESS_STATIC', True)
+        app.config.setdefault('COMPRESS_STATIC_ON_STARTUP', False)
+        app.config.setdefault('COMPRESS_STATIC_MAX_AGE', 31536000)
+        algorithms = app.config['COMPRESS_ALGORITHM']
+        if isinstance(algorithms, str):
+            algorithms = [ x.strip() for x in algorithms.split(',') ]
+        app.config['COMPRESS_ALGORITHM'] = [ x for x in algorithms if x != 'zstd' or zstandard is not None ]
+        super().init_app(app)
+        if app.config['COMPRESS_STATIC']:
+            if app.config['COMPRESS_STATIC_ON_STARTUP']:
+                for folder in static_folders(app):
+                    try:
+                        compress_directory(folder, app.config['COMPRESS_ALGORITHM'])
+                    except OSError as e:
+                        app.logger.warning(f'Could not precompress static files in {folder}: {e}')
+            self._register_static(app)
+
+    def after_request(self, response):
+        if not response.is_streamed:
+            return super().after_request(response)
+        app = self.app or current_app
+        # Streamed responses are compressed chunk by chunk instead of being buffered by flask_compress.
+        if (response.mimetype not in app.config['COMPRESS_MIMETYPES'] or
+                response.status_code < 200 or response.status_code >= 300 or
+                'Content-Encoding' in response.headers):
+            return response
+        algorithm = self._choose_compress_algorithm(request.headers.get('Accept-Encoding', ''))
+        if algorithm is None:
+            return response
+        response.response = self.compress_stream(app, response.response, algorithm)
+        response.direct_passthrough = False
+        response.headers['Content-Encoding'] = algorithm
+        response.headers.pop('Content-Length', None)
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def compress(self, app, response, algorithm):
+        if algorithm == 'zstd':
+            return zstandard.ZstdCompressor(level = app.config['COMPRESS_ZSTD_LEVEL']).compress(response.get_data())
+        return super().compress(app, response, algorithm)
+
+    def compress_stream(self, app, chunks, algorithm):
+        """Compresses iterable of chunks. Every compressed chunk is flushed, so client can process it right away."""
+        if algorithm == 'zstd':
+            compressor = zstandard.ZstdCompressor(level = app.config['COMPRESS_ZSTD_LEVEL']).compressobj()
+            process = compressor.compress
+            flush = lambda: compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            finish = compressor.flush
+        elif algorithm == 'br':
+            compressor = brotli.Compressor(
+                mode = app.config['COMPRESS_BR_MODE'],
+                quality = app.config['COMPRESS_BR_LEVEL'],
+                lgwin = app.config['COMPRESS_BR_WINDOW'],
+                lgblock = app.config['COMPRESS_BR_BLOCK'])
+            process = compressor.process
+            flush = compressor.flush
+            finish = compressor.finish
+        else:
+            if algorithm == 'gzip':
+                compressor = zlib.compressobj(app.config['COMPRESS_LEVEL'], zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            else:
+                compressor = zlib.compressobj(app.config['COMPRESS_DEFLATE_LEVEL'])
+            process = compressor.compress
+            flush = lambda: compressor.flush(zlib.Z_SYNC_FLUSH)
+            finish = compressor.flush
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode('utf-8')
+                if chunk:
+                    yield process(chunk) + flush()
+            yield finish()
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+
+    def _register_static(self, app):
+        folders = {}
+        for endpoint, view in list(app.view_functions.items()):
+            if endpoint == 'static' or endpoint.endswith('.static'):
+                folder = view.__self__.static_folder
+                folders[endpoint] = folder
+                app.view_functions[endpoint] = self._static_view(view, folder)
+
+        @app.url_defaults
+        def add_static_version(endpoint, values):
+            folder = folders.get(endpoint)
+            if folder is not None and 'filename' in values and 'v' not in values:
+                path = safe_join(folder, values['filename'])
+                if path is not None and os.path.isfile(path):
+                    values['v'] = self.digest(path)[:12]
+
+    def digest(self, path):
+        """Returns SHA-1 of the file content. Digest is recomputed only when file's modification time or size change."""
+        stat = os.stat(path)
+        digest = self._digests.get(path)
+        if digest is None or digest[0] != (stat.st_mtime, stat.st_size):
+            sha1 = hashlib.sha1()
+            with open(path, 'rb') as ifile:
+                for chunk in iter(lambda: ifile.read(65536), b''):
+                    sha1.update(chunk)
+            digest = ((stat.st_mtime, stat.st_size), sha1.hexdigest())
+            self._digests[path] = digest
+        return digest[1]
+
+    def _choose_static_encoding(self, path):
+        best_encoding, best_quality = None, 0
+        mtime = None
+        for encoding, suffix in STATIC_ENCODINGS:
+            quality = request.accept_encodings[encoding]
+            if quality <= best_quality:
+                continue
+            try:
+                if mtime is None:
+                    mtime = os.path.getmtime(path)
+                if os.path.getmtime(path + suffix) < mtime:  # stale sibling
+                    continue
+            except OSError:
+                continue
+            best_encoding, best_quality = encoding, quality
+        return best_encoding
+
+    def _static_view(self, view, folder):
+        suffixes = dict(STATIC_ENCODINGS)
+
+        @functools.wraps(view)
+        def send_static_file(filename):
+            path = safe_join(folder, filename)
+            if path is None or not os.path.isfile(path):
+                return view(filename)
+            encoding = self._choose_static_encoding(path)
+            response = send_from_directory(
+                folder, filename + suffixes[encoding] if encoding else filename,
+                mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                add_etags = False,
+                cache_timeout = current_app.config['COMPRESS_STATIC_MAX_AGE'])
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            response.cache_control.public = True
+            digest = self.digest(path)
+            response.set_etag(f'{digest}-{encoding}' if encoding else digest)
+            return response.make_conditional(request)
+
+        return send_static_file
+
+
+@click.command('compress-static')
+@with_appcontext
+def compress_static():
+    """DESCRIPTION:
+
+    Writes precompressed .zst (if zstandard package is installed), .br and .gz siblings of static files."""
+    for folder in static_folders(current_app):
+        n_written = compress_directory(folder, available_algorithms())
+        sys.stdout.write(f"Wrote {n_written} precompressed file(s) in '{folder}'.\n")
@@ -0,0 +1,51 @@
+from array import array
+import math
+
+
+def downsample(rows, start, stop, width):
+    """Aggregates coverage rows into at most `width` equal bins spanning region [start, stop].
+
+    Every bin has 'start', 'end' and 'mean' (mean depth weighted by number of covered bases), 'min' and 'max' (of row
+    mean depths) fields. Rows may span several bins and are weighted by overlap length. Bins without coverage are
+    omitted. Rows are processed in a single pass, accumulating into preallocated typed arrays.
+
+    Arguments:
+    rows -- iterable of coverage rows with 'start', 'end' and 'mean' fields.
+    start, stop -- region (1-based, inclusive).
+    width -- number of bins, e.g. plot width in pixels.
+    """
+    if stop < start:
+        raise ValueError('Region start must not be greater than stop.')
+    length = stop - start + 1
+    n_bins = max(1, min(width, length))
+    bin_size = math.ceil(length / n_bins)
+    n_bins = math.ceil(length / bin_size)
+    weighted_sums = array('d', bytes(8 * n_bins))
+    bases = array('q', bytes(8 * n_bins))
+    mins = array('d', [math.inf]) * n_bins
+    maxs = array('d', [-math.inf]) * n_bins
+    for row in rows:
+        row_start = max(row['start'], start) - start
+        row_end = min(row['end'], stop) - start
+        if row_end < row_start:
+            continue
+        depth = row['mean']
+        for i in range(row_start // bin_size, row_end // bin_size + 1):
+            overlap = min(row_end, (i + 1) * bin_size - 1) - max(row_start, i * bin_size) + 1
+            weighted_sums[i] += depth * overlap
+            bases[i] += overlap
+            if depth < mins[i]:
+                mins[i] = depth
+            if depth > maxs[i]:
+                maxs[i] = depth
+    bins = []
+    for i in range(n_bins):
+        if bases[i] > 0:
+            bins.append({
+                'start': start + i * bin_size,
+                'end': min(start + (i + 1) * bin_size - 1, stop),
+                'mean': weighted_sums[i] / bases[i],
+                'min': mins[i],
+                'max': maxs[i]
+            })
+    return bins
@@ -0,0 +1,135 @@
+from flask import current_app
+from bravo_browser.api_client import api
+from bravo_browser.cache import cache
+import urllib.parse
+import functools
+import json
+import re
+
+
+FILTER_TYPES = {
+   '=': 'eq',
+   '!=': 'ne',
+   '<': 'lt',
+   '>': 'gt',
+   '<=': 'lte',
+   '>=': 'gte'
+}
+
+_regex_field = re.compile(r'^[A-Za-z0-9_.]+$')
+
+# Parsed filters metadata by variants type: (API response body it was parsed from, allowed values by field).
+_allowed_values = {}
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _compile_filter(f):
+    if not isinstance(f, dict) or not all(key in f for key in ('field', 'type', 'value')):
+        raise FilterError('Filter must have "field", "type" and "value".')
+    if not isinstance(f['field'], str) or not _regex_field.match(f['field']):
+        raise FilterError(f'Invalid filter field {f["field"]!r}.')
+    if f['type'] not in FILTER_TYPES:
+        raise FilterError(f'Invalid filter type {f["type"]!r}.')
+    if isinstance(f['value'], (list, dict)) or f['value'] is None:
+        raise FilterError(f'Invalid filter value {f["value"]!r}.')
+    return f['field'], FILTER_TYPES[f['type']], f['value']
+
+
+@functools.lru_cache(maxsize = 1024)
+def _compile(filters_json):
+    """Translates JSON-serialized list of filters into canonical API query arguments.
+
+    Returns tuple of query arguments sorted by field and tuple of (field name, value) pairs to validate against
+    filters metadata. Within a group, conditions are sorted too, so equivalent filter sets give identical arguments.
+    """
+    by_field = {}
+    for f in json.loads(filters_json):
+        if isinstance(f, list):
+            if len(f) == 0:
+                continue
+            conditions = [ _compile_filter(x) for x in f ]
+            if len(set(field for field, _, _ in conditions)) != 1:
+                raise FilterError('Filters in a group must have the same field.')
+        else:
+            conditions = [ _compile_filter(f) ]
+        field = conditions[0][0]
+        group = frozenset((op, json.dumps(value)) for _, op, value in conditions)
+        by_field.setdefault(field, set()).add(group)
+    args = []
+    checks = []
+    for field in sorted(by_field):
+        name = field.rsplit('.', 1)[-1]
+        for group in sorted(by_field[field], key = sorted):
+            conditions = []
+            for op, value in sorted(group):
+                value = json.loads(value)
+                conditions.append(f'{op}:{urllib.parse.quote(str(value), safe = "")}')
+                if op in ('eq', 'ne'):
+                    checks.append((name, value))
+            args.append(f"{field}={','.join(conditions)}")
+    return tuple(args), tuple(checks)
+
+
+def allowed_values(variants_type):
+    """Returns allowed values by field name (e.g. 'consequence', 'lof', 'filter') from API's filters metadata.
+
+    Metadata comes through the response cache and is parsed only when the cached response changes.
+    Returns empty dictionary if metadata is not available or response cache is disabled.
+    """
+    if not cache.enabled:
+        return {}
+    api_response = api.get(f'/{variants_type}/filters', cache_ttl = current_app.config['BRAVO_API_CACHE_TTLS'].get('variants_meta', 0))
+    if api_response.status_code != 200:
+        return {}
+    parsed = _allowed_values.get(variants_type, None)
+    if parsed is None or parsed[0] != api_response.body:  # disk and redis cache backends return a copy of the body every time
+        payload = api_response.json()
+        allowed = {}
+        if not payload.get('error', None) and isinstance(payload.get('data', None), dict):
+            for name, values in payload['data'].items():
+                if isinstance(values, list):
+                    allowed[name] = frozenset(x['value'] for x in values if isinstance(x, dict) and 'value' in x)
+        parsed = (api_response.body, allowed)
+        _allowed_values[variants_type] = parsed
+    return parsed[1]
+
+
+def translate(filters, variants_type = None):
+    """Translates list of filters posted by web components into canonical list of API query arguments.
+
+    Every filter is {"field": ..., "type": ..., "value": ...}. A list of filters on the same field is a group of
+    alternatives. Translations are memoized. Raises FilterError if filters are malformed or, when `variants_type` is
+    given, if an equality value is not among the allowed ones (see `allowed_values`).
+
+    Arguments:
+    filters -- list of filters and groups of filters.
+    variants_type -- 'snv' or 'sv', or None to skip validation of values.
+    """
+    args, checks = _compile(json.dumps(filters, sort_keys = True, separators = (',', ':')))
+    if checks and variants_type is not None:
+        allowed = allowed_values(variants_type)
+        for name, value in checks:
+            values = allowed.get(name, None)
+            if values is not None and value not in values:
+                raise FilterError(f'Invalid value {value!r} for filter {name!r}.')
+    return list(args)
+
+
+def query_args(variants_type, params, extra = ()):
+    """Returns canonical API query arguments for JSON parameters posted by web components.
+
+    Arguments:
+    variants_type -- 'snv' or 'sv'.
+    params -- posted JSON parameters or None.
+    extra -- names of other parameters to pass as is, e.g. 'windows' or 'introns'.
+    """
+    if not params:
+        return []
+    args = translate(params.get('filters', []), variants_type)
+    for name in sorted(extra):
+        if name in params:
+            args.append(f'{name}={params[name]}')
+    return args
@@ -0,0 +1,146 @@
+from flask import current_app
+from flask.cli import with_appcontext
+from array import array
+import threading
+import logging
+import bisect
+import click
+import gzip
+import time
+import sys
+import os
+
+
+def _open(filename, mode = 'rt'):
+    return gzip.open(filename, mode) if filename.endswith('.gz') else open(filename, mode)
+
+
+class GeneIndex(object):
+    """In-process index of gene names for autocomplete.
+
+    Genes are kept in parallel arrays sorted by upper-case name, so all genes with a name prefix are found with
+    two binary searches. The index is loaded from GENE_INDEX_FILE (tab-delimited name, chrom, start, stop and type;
+    see `build-gene-index` command) and reloaded when the file changes.
+    """
+    __slots__ = ('_genes', '_filename', '_signature', '_checked', '_lock', 'check_interval')
+
+    def __init__(self, app = None):
+        self._genes = None
+        self._filename = None
+        self._signature = None
+        self._checked = None
+        self._lock = threading.Lock()
+        self.check_interval = 10
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('GENE_INDEX_FILE', os.path.join(app.instance_path, 'genes.tsv.gz'))
+        app.config.setdefault('GENE_INDEX_CHECK_INTERVAL', 10)
+        self._filename = app.config['GENE_INDEX_FILE']
+        self.check_interval = app.config['GENE_INDEX_CHECK_INTERVAL']
+        self._genes = None
+        self._signature = None
+        self._checked = None
+        self.refresh()
+
+    @property
+    def loaded(self):
+        self.refresh()
+        return self._genes is not None
+
+    def load(self, filename):
+        genes = []
+        with _open(filename) as ifile:
+            for line in ifile:
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) < 5 or line.startswith('#'):
+                    continue
+                genes.append((fields[0].upper(), fields[0], sys.intern(fields[1]), int(fields[2]), int(fields[3]), sys.intern(fields[4])))
+        genes.sort()
+        # Swapped in at once, so concurrent searches see either old or new index.
+        self._genes = (
+            [ x[0] for x in genes ],
+            [ x[1] for x in genes ],
+            [ x[2] for x in genes ],
+            array('l', (x[3] for x in genes)),
+            array('l', (x[4] for x in genes)),
+            [ x[5] for x in genes ])
+
+    def refresh(self):
+        """(Re)loads the index if the file was created or modified. The file is checked at most every `check_interval` seconds."""
+        now = time.monotonic()
+        if self._filename is None or (self._checked is not None and now - self._checked < self.check_interval):
+            return
+        with self._lock:
+            if self._checked is not None and now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                stat = os.stat(self._filename)
+            except OSError:
+                return
+            signature = (stat.st_mtime, stat.st_size)
+            if signature != self._signature:
+                try:
+                    self.load(self._filename)
+                    self._signature = signature
+                except (OSError, ValueError) as e:
+                    logging.getLogger(__name__).warning(f'Could not load gene index from {self._filename}: {e}')
+
+    def search(self, prefix, limit = 10):
+        """Returns up to `limit` (name, chrom, start, stop, type) tuples of genes with the name prefix (case-insensitive)."""
+        self.refresh()
+        genes = self._genes
+        if genes is None or not prefix:
+            return []
+        keys, names, chroms, starts, stops, types = genes
+        prefix = prefix.upper()
+        i = bisect.bisect_left(keys, prefix)
+        j = min(bisect.bisect_left(keys, prefix + '\uffff', i), i + limit)
+        return [ (names[k], chroms[k], starts[k], stops[k], types[k]) for k in range(i, j) ]
+
+
+gene_index = GeneIndex()
+
+
+def _gtf_attributes(attributes):
+    values = {}
+    for attribute in attributes.split(';'):
+        name, _, value = attribute.strip().partition(' ')
+        if name:
+            values[name] = value.strip('"')
+    return values
+
+
+@click.command('build-gene-index')
+@click.argument('gtf_file', type=click.Path(exists=True))
+@with_appcontext
+def build_gene_index(gtf_file):
+    """DESCRIPTION:
+
+    Writes gene index used by autocomplete (GENE_INDEX_FILE) from GENCODE GTF file. Running workers reload it automatically.
+
+    ARGUMENTS:
+
+    gtf_file -- GENCODE GTF file (can be gzip-compressed)
+    """
+    filename = current_app.config['GENE_INDEX_FILE']
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok = True)
+    tmp_filename = f'{filename}.{os.getpid()}.tmp'
+    n_genes = 0
+    with _open(gtf_file) as ifile, (gzip.open(tmp_filename, 'wt') if filename.endswith('.gz') else open(tmp_filename, 'wt')) as ofile:
+        for line in ifile:
+            if line.startswith('#'):
+                continue
+            fields = line.rstrip('\n').split('\t')
+            if len(fields) < 9 or fields[2] != 'gene':
+                continue
+            attributes = _gtf_attributes(fields[8])
+            chrom = fields[0][3:] if fields[0].startswith('chr') else fields[0]
+            name = attributes.get('gene_name', attributes.get('gene_id', ''))
+            if name:
+                ofile.write(f"{name}\t{chrom}\t{fields[3]}\t{fields[4]}\t{attributes.get('gene_type', '')}\n")
+                n_genes += 1
+    os.replace(tmp_filename, filename)
+    sys.stdout.write(f"Wrote {n_genes} gene(s) to '{filename}'.\n")
@@ -1,6 +1,7 @@
 from flask_pymongo import PyMongo
 import click
 from flask.cli import with_appcontext
+import time
 import sys
 
 
@@ -20,21 +21,39 @@ def create_users():
 
 @click.command('load-whitelist')
 @click.argument('whitelist_file', type=click.Path(exists=True))
-def load_whitelist(whitelist_file):
+@click.option('--batch-size', type=click.IntRange(min=1), default=10000, show_default=True, help='Number of emails inserted at once.')
+@with_appcontext
+def load_whitelist(whitelist_file, batch_size):
     """DESCRIPTION:
 
-    Creates and populates the 'whitelist' collection.
+    Creates and populates the 'whitelist' collection. Emails are loaded into a staging collection, which then
+    atomically replaces the 'whitelist' collection, so the current whitelist stays in effect during the load.
 
     ARGUMENTS:
 
     whitelist_file -- file with emails (one email per line)
     """
-    mongo.db.whitelist.drop()
+    staging = mongo.db['whitelist_staging']
+    staging.drop()
+    mongo.db.create_collection(staging.name)
+    n_emails = 0
+    start = time.monotonic()
+    batch = []
     with open(whitelist_file, 'r') as ifile:
         for line in ifile:
             email = line.strip()
             if email and '@' in email:
-                mongo.db.whitelist.insert({'user_id': email})
-    mongo.db.whitelist.create_index('user_id')
+                batch.append({'user_id': email})
+                if len(batch) >= batch_size:
+                    staging.insert_many(batch, ordered=False)
+                    n_emails += len(batch)
+                    batch = []
+                    sys.stdout.write(f"Inserted {n_emails} email(s) ({n_emails / max(time.monotonic() - start, 1e-6):.0f} emails/s).\n")
+    if batch:
+        staging.insert_many(batch, ordered=False)
+        n_emails += len(batch)
+    staging.create_index('user_id')
+    staging.rename('whitelist', dropTarget=True)
+    elapsed = time.monotonic() - start
     sys.stdout.write(f"Created 'whitelist' collection and inserted "
-                     f"{mongo.db.whitelist.count()} email(s).\n ")
+                     f"{n_emails} email(s) in {elapsed:.1f} s ({n_emails / max(elapsed, 1e-6):.0f} emails/s).\n")
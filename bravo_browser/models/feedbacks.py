@@ -1,6 +1,7 @@
 from bravo_browser.models.database import mongo
+from bravo_browser.models.write_behind import write_behind
 
 
 def save(email, page, message):
     if message.strip() and page.strip():
-        mongo.db.feedbacks.insert_one({'user_id': email, 'page': page, 'message': message})
+        write_behind.insert(mongo.db.feedbacks, {'user_id': email, 'page': page, 'message': message})
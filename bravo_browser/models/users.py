@@ -1,21 +1,124 @@
+from flask import current_app
 from bravo_browser.models.database import mongo
+from bravo_browser.models.write_behind import write_behind
+from bravo_browser.cache import MemoryBackend
+from array import array
+import threading
+import hashlib
+import bisect
+import time
+
+
+# Per-worker cache of user documents by email, so authorized requests don't query MongoDB every time.
+# Only users who agreed to terms are cached: other workers can't see invalidation, and a stale "not agreed"
+# would send the user back to the terms page.
+_cache = MemoryBackend(max_entries = 10000, max_bytes = float('inf'))
+
+
+def init_app(app):
+    global _cache
+    app.config.setdefault('USER_CACHE_TTL', 60)
+    app.config.setdefault('USER_CACHE_MAX_ENTRIES', 10000)
+    _cache = MemoryBackend(max_entries = app.config['USER_CACHE_MAX_ENTRIES'], max_bytes = float('inf'))
+    whitelist.init_app(app)
+
+
+def invalidate(email):
+    _cache.delete(email)
 
 
 def load(email):
-    return mongo.db.users.find_one({'user_id': email}, projection={'_id': False})
+    document = _cache.get(email)
+    if document is not None:
+        return document
+    document = mongo.db.users.find_one({'user_id': email}, projection={'_id': False})
+    ttl = current_app.config['USER_CACHE_TTL']
+    if document is not None and document.get('agreed_to_terms', False) and ttl:
+        _cache.set(email, document, ttl)
+    return document
+
+
+class Whitelist(object):
+    """Per-worker copy of the 'whitelist' collection, so login checks don't query MongoDB.
+
+    The copy is loaded on first use and then refreshed in a background thread every WHITELIST_REFRESH_INTERVAL
+    seconds, while checks keep using the previous copy. Whitelists longer than WHITELIST_COMPACT_THRESHOLD are kept
+    as a sorted array of 64-bit email hashes instead of a set of strings.
+    """
+
+    def __init__(self):
+        self._emails = None
+        self._loaded = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        app.config.setdefault('WHITELIST_REFRESH_INTERVAL', 300)
+        app.config.setdefault('WHITELIST_COMPACT_THRESHOLD', 100000)
+        self.invalidate()
+
+    @staticmethod
+    def _digest(email):
+        return int.from_bytes(hashlib.blake2b(email.encode('utf-8'), digest_size = 8).digest(), 'little')
+
+    def _load(self):
+        if 'whitelist' not in mongo.db.list_collection_names():
+            emails = frozenset()
+        else:
+            emails = [ document['user_id'] for document in mongo.db.whitelist.find({}, projection={'_id': False, 'user_id': True}) ]
+            if len(emails) > current_app.config['WHITELIST_COMPACT_THRESHOLD']:
+                emails = array('Q', sorted(set(self._digest(x) for x in emails)))
+            else:
+                emails = frozenset(emails)
+        self._emails = emails
+        self._loaded = time.monotonic()
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        app = current_app._get_current_object()
+        def refresh():
+            try:
+                with app.app_context():
+                    self._load()
+            except Exception:
+                app.logger.exception('Could not refresh whitelist.')
+                self._loaded = time.monotonic()  # keep the previous copy until the next interval
+            finally:
+                self._refreshing = False
+        threading.Thread(target = refresh, name = 'bravo-whitelist', daemon = True).start()
+
+    def invalidate(self):
+        self._emails = None
+
+    def __contains__(self, email):
+        if self._emails is None:
+            with self._lock:
+                if self._emails is None:
+                    self._load()
+        emails = self._emails
+        if time.monotonic() - self._loaded > current_app.config['WHITELIST_REFRESH_INTERVAL']:
+            self._refresh_in_background()
+        if len(emails) == 0:  # if whitelist is empty, then we assume that it is desabled
+            return True
+        if isinstance(emails, array):
+            digest = self._digest(email)
+            i = bisect.bisect_left(emails, digest)
+            return i < len(emails) and emails[i] == digest
+        return email in emails
+
+
+whitelist = Whitelist()
 
 
 def in_whitelist(email):
-    if 'whitelist' not in mongo.db.list_collection_names():
-        return True
-    n_documents = mongo.db.whitelist.count_documents({})
-    if n_documents == 0:  # if whitelist is empty, then we assume that it is desabled
-        return True
-    document = mongo.db.whitelist.find_one({'user_id': email}, projection={'_id': False})
-    return (document is not None)
+    return email in whitelist
 
 
 def save(email, picture):
+    invalidate(email)
     result = mongo.db.users.insert_one(
         {'user_id': email, 'picture': picture, 'agreed_to_terms': False})
     return mongo.db.users.find_one({'_id': result.inserted_id}, projection={'_id': False})
@@ -23,7 +126,11 @@ def save(email, picture):
 
 def update_agreed_to_terms(email, agreed):
     mongo.db.users.update_one({'user_id': email}, {'$set': {'agreed_to_terms': agreed}})
+    invalidate(email)
 
 
 def update_picture(email, picture):
-    mongo.db.users.update_one({'user_id': email}, {'$set': {'picture': picture}})
+    write_behind.update(mongo.db.users, {'user_id': email}, {'$set': {'picture': picture}})
+    document = _cache.get(email)
+    if document is not None:  # the write may not be done yet, so cached document is updated instead of reloaded
+        _cache.set(email, dict(document, picture=picture), current_app.config['USER_CACHE_TTL'])
@@ -0,0 +1,118 @@
+from pymongo import InsertOne, UpdateOne
+import threading
+import logging
+import atexit
+import queue
+import time
+import os
+
+
+class WriteBehind(object):
+    """Per-worker queue of MongoDB writes which a background thread applies in batches, so requests don't wait for them.
+
+    Queued writes are taken in batches of up to WRITE_BEHIND_BATCH_SIZE, at least every WRITE_BEHIND_FLUSH_INTERVAL
+    seconds, and the batch's writes into a collection are done with one `bulk_write`. At most WRITE_BEHIND_MAX_QUEUE writes
+    are queued; when the queue is full, writes are done synchronously. Queued writes are flushed when the worker
+    exits. Use only for writes that can be lost if the worker crashes (e.g. feedback, user pictures).
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.max_queue = 10000
+        self.batch_size = 500
+        self.flush_interval = 1.0
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('WRITE_BEHIND', True)
+        app.config.setdefault('WRITE_BEHIND_MAX_QUEUE', 10000)
+        app.config.setdefault('WRITE_BEHIND_BATCH_SIZE', 500)
+        app.config.setdefault('WRITE_BEHIND_FLUSH_INTERVAL', 1.0)
+        self.enabled = app.config['WRITE_BEHIND']
+        self.max_queue = app.config['WRITE_BEHIND_MAX_QUEUE']
+        self.batch_size = app.config['WRITE_BEHIND_BATCH_SIZE']
+        self.flush_interval = app.config['WRITE_BEHIND_FLUSH_INTERVAL']
+
+    def _get_queue(self):
+        pid = os.getpid()
+        if self._queue is None or self._pid != pid:
+            with self._lock:
+                if self._queue is None or self._pid != pid:
+                    self._queue = queue.Queue(maxsize = self.max_queue)
+                    self._pid = pid
+                    threading.Thread(target = self._run, args = (self._queue,), name = 'bravo-write-behind', daemon = True).start()
+        return self._queue
+
+    def insert(self, collection, document):
+        self._submit(collection, ('insert', document))
+
+    def update(self, collection, filter, update):
+        self._submit(collection, ('update', filter, update))
+
+    def _submit(self, collection, operation):
+        if self.enabled:
+            try:
+                self._get_queue().put_nowait((collection, operation))
+                return
+            except queue.Full:
+                pass
+        self._write([(collection, operation)])
+
+    @staticmethod
+    def _apply(collection, operations):
+        requests = [ InsertOne(operation[1]) if operation[0] == 'insert' else UpdateOne(operation[1], operation[2]) for operation in operations ]
+        filters = [ repr(operation[1]) for operation in operations if operation[0] == 'update' ]
+        try:
+            # Unordered, unless several updates of the same document must be applied in the order they were queued.
+            collection.bulk_write(requests, ordered = len(set(filters)) != len(filters))
+        except Exception:
+            logging.getLogger(__name__).exception(f'Could not write {len(operations)} operation(s) to {collection.full_name}.')
+
+    @classmethod
+    def _write(cls, batch):
+        """Applies operations with one `bulk_write` per collection."""
+        by_collection = {}
+        for collection, operation in batch:
+            by_collection.setdefault(collection.full_name, (collection, []))[1].append(operation)
+        for collection, operations in by_collection.values():
+            cls._apply(collection, operations)
+
+    def _run(self, q):
+        while True:
+            batch = []
+            operation = q.get()
+            deadline = time.monotonic() + self.flush_interval
+            while operation is not None:  # None is put by `flush` to write the batch right away
+                batch.append(operation)
+                timeout = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or timeout <= 0:
+                    break
+                try:
+                    operation = q.get(timeout = timeout)
+                except queue.Empty:
+                    break
+            else:
+                q.task_done()
+            self._write(batch)
+            for _ in batch:
+                q.task_done()
+
+    def flush(self, timeout = 10):
+        """Waits up to `timeout` seconds until all queued operations are written."""
+        q = self._queue
+        if q is None or self._pid != os.getpid():
+            return
+        try:
+            q.put_nowait(None)
+        except queue.Full:
+            pass  # the worker writes full batches without waiting
+        deadline = time.monotonic() + timeout
+        while q.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+write_behind = WriteBehind()
@@ -0,0 +1,108 @@
+from flask import current_app
+from werkzeug.http import parse_cache_control_header, parse_date
+from bravo_browser.api_client import SingleFlight
+from datetime import datetime, timezone
+import google_auth_oauthlib.flow
+import requests
+import threading
+import json
+import time
+import os
+
+
+SCOPES = ['openid', 'https://www.googleapis.com/auth/userinfo.email']
+
+
+def cache_lifetime(headers, default):
+    """Returns number of seconds the HTTP response can be cached for according to its Cache-Control, Age and Expires headers."""
+    cache_control = parse_cache_control_header(headers.get('Cache-Control', None))
+    if cache_control.no_store or cache_control.no_cache:
+        return 0
+    if cache_control.max_age is not None:
+        try:
+            age = int(headers.get('Age', 0))
+        except ValueError:
+            age = 0
+        return max(0, cache_control.max_age - age)
+    expires = parse_date(headers.get('Expires', None))
+    if expires is not None:
+        if expires.tzinfo is None:
+            expires = expires.replace(tzinfo = timezone.utc)
+        return max(0, (expires - datetime.now(timezone.utc)).total_seconds())
+    return default
+
+
+class OAuth(object):
+    """Per-worker cache of OAuth client configuration and OpenID Connect discovery document.
+
+    Client configuration (GOOGLE_OAUTH_CLIENT_SECRET file) is parsed once and again only when the file changes.
+    Discovery document (OAUTH_DISCOVERY_URL) is kept as long as its cache headers allow and concurrent fetches
+    of it are coalesced, so a burst of logins makes one outbound call. Identity provider calls use a keep-alive
+    session.
+    """
+
+    def __init__(self, app=None):
+        self._client_config = None
+        self._discovery = None
+        self._in_flight = SingleFlight()
+        self._session = None
+        self._session_pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('OAUTH_DISCOVERY_URL', 'https://accounts.google.com/.well-known/openid-configuration')
+        app.config.setdefault('OAUTH_DISCOVERY_DEFAULT_TTL', 3600)
+        app.config.setdefault('OAUTH_TIMEOUT', (3.05, 10))
+        self._client_config = None
+        self._discovery = None
+
+    @property
+    def session(self):
+        pid = os.getpid()
+        if self._session is None or self._session_pid != pid:
+            with self._lock:
+                if self._session is None or self._session_pid != pid:
+                    self._session = requests.Session()
+                    self._session_pid = pid
+        return self._session
+
+    def client_config(self):
+        filename = current_app.config['GOOGLE_OAUTH_CLIENT_SECRET']
+        stat = os.stat(filename)
+        signature = (filename, stat.st_mtime, stat.st_size)
+        client_config = self._client_config
+        if client_config is None or client_config[0] != signature:
+            with open(filename, 'r') as ifile:
+                client_config = (signature, json.load(ifile))
+            self._client_config = client_config
+        return client_config[1]
+
+    def flow(self, state = None):
+        """Returns new `Flow` (it holds per-login state) from the cached client configuration."""
+        return google_auth_oauthlib.flow.Flow.from_client_config(self.client_config(), scopes = SCOPES, state = state)
+
+    def _fetch_discovery(self):
+        response = self.session.get(current_app.config['OAUTH_DISCOVERY_URL'], timeout = current_app.config['OAUTH_TIMEOUT'])
+        response.raise_for_status()
+        ttl = cache_lifetime(response.headers, current_app.config['OAUTH_DISCOVERY_DEFAULT_TTL'])
+        discovery = (time.monotonic() + ttl, response.json())
+        self._discovery = discovery
+        return discovery
+
+    def discovery(self):
+        discovery = self._discovery
+        if discovery is None or discovery[0] <= time.monotonic():
+            discovery = self._in_flight.do(current_app.config['OAUTH_DISCOVERY_URL'], self._fetch_discovery)
+        return discovery[1]
+
+    def userinfo(self, token):
+        response = self.session.get(self.discovery()['userinfo_endpoint'],
+            headers = { 'Authorization': f'Bearer {token}' },
+            timeout = current_app.config['OAUTH_TIMEOUT'])
+        response.raise_for_status()
+        return response.json()
+
+
+oauth = OAuth()
@@ -0,0 +1,251 @@
+"""Memory-mapped rsID to variant lookup table.
+
+Layout (all integers little-endian uint64):
+
+    b'BRVRSID1' | n | keys (n rsID numbers, sorted) | offsets (n + 1) | records
+
+The i-th record is records[offsets[i]:offsets[i + 1]], i.e. UTF-8 "<variant_id>\t<type>". One rsID can map to
+several variants, so keys may repeat.
+"""
+from flask import current_app
+from flask.cli import with_appcontext
+from array import array
+import threading
+import tempfile
+import heapq
+import logging
+import bisect
+import struct
+import click
+import gzip
+import mmap
+import time
+import sys
+import os
+
+
+MAGIC = b'BRVRSID1'
+
+
+class RsidIndex(object):
+    """Sorted rsID numbers which are binary-searched in the memory-mapped table (see RSID_INDEX_FILE and `build-rsid-index` command).
+
+    Pages of the table are shared by all workers on the host. The table is re-mapped when the file changes.
+    """
+    __slots__ = ('_table', '_filename', '_signature', '_checked', '_lock', 'check_interval')
+
+    def __init__(self, app = None):
+        self._table = None
+        self._filename = None
+        self._signature = None
+        self._checked = None
+        self._lock = threading.Lock()
+        self.check_interval = 10
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RSID_INDEX_FILE', os.path.join(app.instance_path, 'rsids.bin'))
+        app.config.setdefault('RSID_INDEX_CHECK_INTERVAL', 10)
+        self._filename = app.config['RSID_INDEX_FILE']
+        self.check_interval = app.config['RSID_INDEX_CHECK_INTERVAL']
+        self._table = None
+        self._signature = None
+        self._checked = None
+        self.refresh()
+
+    @property
+    def loaded(self):
+        self.refresh()
+        return self._table is not None
+
+    @staticmethod
+    def _map(filename):
+        with open(filename, 'rb') as ifile:
+            buffer = mmap.mmap(ifile.fileno(), 0, access = mmap.ACCESS_READ)
+        if buffer[:8] != MAGIC:
+            buffer.close()
+            raise ValueError('Not an rsID table.')
+        n, = struct.unpack_from('<Q', buffer, 8) if len(buffer) >= 16 else (0,)
+        start = 16 + 8 * (2 * n + 1)  # records start after the header, keys and offsets
+        if len(buffer) < start or len(buffer) < start + struct.unpack_from('<Q', buffer, start - 8)[0]:
+            buffer.close()
+            raise ValueError('Truncated rsID table.')
+        view = memoryview(buffer)
+        if sys.byteorder == 'little':
+            keys = view[16:16 + 8 * n].cast('Q')
+            offsets = view[16 + 8 * n:start].cast('Q')
+        else:
+            keys = array('Q', view[16:16 + 8 * n])
+            keys.byteswap()
+            offsets = array('Q', view[16 + 8 * n:start])
+            offsets.byteswap()
+        return (buffer, keys, offsets, start)
+
+    def refresh(self):
+        """(Re)maps the table if the file was created or modified. The file is checked at most every `check_interval` seconds."""
+        now = time.monotonic()
+        if self._filename is None or (self._checked is not None and now - self._checked < self.check_interval):
+            return
+        with self._lock:
+            if self._checked is not None and now - self._checked < self.check_interval:
+                return
+            self._checked = now
+            try:
+                stat = os.stat(self._filename)
+            except OSError:
+                return
+            signature = (stat.st_mtime, stat.st_size, stat.st_ino)
+            if signature != self._signature:
+                try:
+                    self._table = self._map(self._filename)  # old mapping is unmapped when the last reference to it is gone
+                    self._signature = signature
+                except (OSError, ValueError) as e:
+                    logging.getLogger(__name__).warning(f'Could not load rsID table from {self._filename}: {e}')
+
+    @staticmethod
+    def _records(table, i, j):
+        buffer, _, offsets, start = table
+        return [ tuple(buffer[start + offsets[k]:start + offsets[k + 1]].decode('utf-8').split('\t', 1)) for k in range(i, j) ]
+
+    def lookup(self, rsid):
+        """Returns list of (variant_id, type) of the rsID (e.g. 'rs123')."""
+        self.refresh()
+        table = self._table
+        if table is None or not rsid.startswith('rs') or not rsid[2:].isdigit():
+            return []
+        number = int(rsid[2:])
+        keys = table[1]
+        i = bisect.bisect_left(keys, number)
+        j = bisect.bisect_right(keys, number, i)
+        return self._records(table, i, j)
+
+    def search(self, prefix, limit = 10):
+        """Returns up to `limit` (rsID, variant_id, type) tuples of rsIDs with the prefix (e.g. 'rs12'), shorter rsIDs first."""
+        self.refresh()
+        table = self._table
+        if table is None or not prefix.startswith('rs') or not prefix[2:].isdigit() or prefix[2] == '0':
+            return []
+        keys = table[1]
+        if len(keys) == 0:
+            return []
+        number = int(prefix[2:])
+        results = []
+        low, high = number, number + 1
+        while low <= keys[-1] and len(results) < limit:  # rsIDs with the prefix and k more digits are in [number * 10^k, (number + 1) * 10^k)
+            i = bisect.bisect_left(keys, low)
+            j = min(bisect.bisect_left(keys, high, i), i + limit - len(results))
+            for k, (variant_id, variant_type) in zip(range(i, j), self._records(table, i, j)):
+                results.append((f'rs{keys[k]}', variant_id, variant_type))
+            low, high = low * 10, high * 10
+        return results
+
+
+rsid_index = RsidIndex()
+
+
+# Entry of a sorted run file: key, record length, then record.
+_run_entry = struct.Struct('<QI')
+
+
+def _write_run(entries, directory):
+    """Writes sorted (key, record) entries to a temporary run file. Returns its name."""
+    entries.sort(key = lambda x: x[0])
+    with tempfile.NamedTemporaryFile('wb', dir = directory, suffix = '.run', delete = False) as ofile:
+        for key, record in entries:
+            ofile.write(_run_entry.pack(key, len(record)))
+            ofile.write(record)
+    return ofile.name
+
+
+def _read_run(filename):
+    with open(filename, 'rb', buffering = 1 << 20) as ifile:
+        while True:
+            header = ifile.read(_run_entry.size)
+            if not header:
+                break
+            key, length = _run_entry.unpack(header)
+            yield key, ifile.read(length)
+
+
+def _write_array(ofile, values):
+    if sys.byteorder != 'little':
+        values.byteswap()
+    ofile.write(values.tobytes())
+    del values[:]
+
+
+@click.command('build-rsid-index')
+@click.argument('tsv_file', type=click.Path(exists=True))
+@click.option('--chunk-size', type=click.IntRange(min = 1), default = 2000000, show_default = True, help = 'Number of rsID records sorted in memory at a time.')
+@with_appcontext
+def build_rsid_index(tsv_file, chunk_size):
+    """DESCRIPTION:
+
+    Writes rsID lookup table (RSID_INDEX_FILE) used by search and autocomplete. Running workers reload it automatically.
+    Records are sorted in chunks of --chunk-size, which are written to temporary files next to RSID_INDEX_FILE and then merged.
+
+    ARGUMENTS:
+
+    tsv_file -- tab-delimited file (can be gzip-compressed) with CHROM, POS, ID, REF, ALT and optional consequence columns, e.g. from `bcftools query -f '%CHROM\\t%POS\\t%ID\\t%REF\\t%ALT\\n'`. Multiple IDs are separated by ';' and multiple ALTs by ','.
+    """
+    filename = current_app.config['RSID_INDEX_FILE']
+    directory = os.path.dirname(os.path.abspath(filename))
+    os.makedirs(directory, exist_ok = True)
+    with tempfile.TemporaryDirectory(dir = directory) as tmp_directory:
+        runs = []
+        entries = []
+        n = 0
+        records_size = 0
+        with (gzip.open(tsv_file, 'rt') if tsv_file.endswith('.gz') else open(tsv_file, 'rt')) as ifile:
+            for line in ifile:
+                if line.startswith('#'):
+                    continue
+                fields = line.rstrip('\n').split('\t')
+                if len(fields) < 5:
+                    continue
+                chrom = fields[0][3:] if fields[0].startswith('chr') else fields[0]
+                variant_type = fields[5] if len(fields) > 5 else ''
+                for rsid in fields[2].split(';'):
+                    if not rsid.startswith('rs') or not rsid[2:].isdigit():
+                        continue
+                    for alt in fields[4].split(','):
+                        record = f'{chrom}-{fields[1]}-{fields[3]}-{alt}\t{variant_type}'.encode('utf-8')
+                        entries.append((int(rsid[2:]), record))
+                        n += 1
+                        records_size += len(record)
+                        if len(entries) >= chunk_size:
+                            runs.append(_write_run(entries, tmp_directory))
+                            entries = []
+        if entries:
+            runs.append(_write_run(entries, tmp_directory))
+            entries = []
+        # Keys, offsets and records are written while merging through separate handles to their sections of the file.
+        keys_start = 16
+        offsets_start = keys_start + 8 * n
+        records_start = offsets_start + 8 * (n + 1)
+        tmp_filename = f'{filename}.{os.getpid()}.tmp'
+        with open(tmp_filename, 'wb') as ofile:
+            ofile.write(MAGIC)
+            ofile.write(struct.pack('<Q', n))
+            ofile.truncate(records_start + records_size)
+        with open(tmp_filename, 'r+b') as keys_file, open(tmp_filename, 'r+b') as offsets_file, open(tmp_filename, 'r+b') as records_file:
+            keys_file.seek(keys_start)
+            offsets_file.seek(offsets_start)
+            records_file.seek(records_start)
+            keys = array('Q')
+            offsets = array('Q', [0])
+            offset = 0
+            # heapq.merge is stable, so records of the same rsID keep their input order.
+            for key, record in heapq.merge(*(_read_run(run) for run in runs), key = lambda x: x[0]):
+                keys.append(key)
+                offset += len(record)
+                offsets.append(offset)
+                records_file.write(record)
+                if len(keys) >= 65536:
+                    _write_array(keys_file, keys)
+                    _write_array(offsets_file, offsets)
+            _write_array(keys_file, keys)
+            _write_array(offsets_file, offsets)
+    os.replace(tmp_filename, filename)
+    sys.stdout.write(f"Wrote {n} rsID(s) to '{filename}'.\n")
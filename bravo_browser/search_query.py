@@ -0,0 +1,100 @@
+from collections import namedtuple
+import re
+
+
+SearchQuery = namedtuple('SearchQuery', ['kind', 'chrom', 'start', 'stop', 'ref', 'alt', 'value'])
+SearchQuery.__doc__ = """Typed search value.
+
+kind -- 'region' (chrom, start, stop), 'position' (chrom, start == stop), 'variant' (chrom, start == stop, ref, alt),
+        'rsid' (value, e.g. 'rs123') or 'gene' (value).
+"""
+
+# RefSeq accessions of GRCh37/GRCh38 chromosomes, used in HGVS notation, e.g. NC_000022.11:g.100A>C
+_refseq_chroms = { f'NC_{i:06d}': str(i) for i in range(1, 23) }
+_refseq_chroms.update({ 'NC_000023': 'X', 'NC_000024': 'Y', 'NC_012920': 'MT' })
+
+# Case-insensitive by character classes, which is faster than re.IGNORECASE
+_chrom = r'(?:[Cc][Hh][Rr])?(\d+|[XxYy]|[Mm][Tt]?)'
+_sep = r'\s*[-:/]\s*'
+_number = r'([\d,]+)'
+_allele = r'([ATCGatcg]+)'
+
+# Formats starting with chromosome. Regions and positions end with a digit and variants with an allele, so the last
+# character selects one of the two expressions. Which groups are set tells the variant format.
+# chr-start-end or chr:pos
+_regex_chrom_region = re.compile(rf'{_chrom}{_sep}{_number}(?:{_sep}{_number})?\Z')
+_regex_chrom_variant = re.compile(
+    rf'{_chrom}(?:'
+    # chr-pos-ref-alt
+    rf'{_sep}{_number}{_sep}{_allele}{_sep}{_allele}'
+    # HGVS-like: chr22:g.100A>C or 22:g.100A>C
+    rf'|:[Gg]\.(\d+){_allele}>{_allele}'
+    r')\Z')
+
+# HGVS with RefSeq accession, e.g. NC_000022.11:g.100A>C
+_regex_refseq_query = re.compile(rf'([Nn][Cc]_\d{{6}})(?:\.\d+)?:[Gg]\.(\d+){_allele}>{_allele}\Z')
+
+_chrom_first_chars = '0123456789cCxXyYmM'
+_digits = '0123456789'
+
+# Spellings of chromosome in the common "chr:start-stop" region shape, which is parsed without regular expressions.
+_region_chroms = { prefix + spelling: name
+    for name in [ *map(str, range(1, 23)), 'X', 'Y', 'M', 'MT' ]
+    for prefix in [ '', 'chr', 'Chr', 'CHR' ]
+    for spelling in { name, name.lower(), name.capitalize() } }
+
+
+def _gene(value):
+    return SearchQuery('gene', None, None, None, None, None, value)
+
+
+def classify(value):
+    """Classifies typed search value in a single pass. Returns `SearchQuery`.
+
+    The first character selects the only candidate format (chromosome, rsID or RefSeq accession), so at most one
+    regular expression is matched. Plain regions (e.g. "chr22:50000-50100") are parsed with string methods before
+    any expression. Values which don't match are gene names.
+    """
+    value = value.strip()
+    if ':' in value:  # cheap pre-check of the common region shape, which avoids the regular expression
+        chrom, _, positions = value.partition(':')
+        chrom = _region_chroms.get(chrom)
+        if chrom is not None:
+            start, _, stop = positions.partition('-')
+            if start.isdecimal() and stop.isdecimal():
+                return SearchQuery._make(('region', chrom, int(start), int(stop), None, None, value))  # faster than the constructor
+    if not value:
+        return _gene(value)
+    first = value[0]
+    if first in _chrom_first_chars:
+        if value[-1] in _digits:
+            match = _regex_chrom_region.match(value)
+            if match is None:
+                return _gene(value)
+            chrom, pos, stop = match.group(1, 2, 3)
+            pos = int(pos) if ',' not in pos else int(pos.replace(',', ''))
+            if stop is None:
+                return SearchQuery('position', chrom.upper(), pos, pos, None, None, value)
+            stop = int(stop) if ',' not in stop else int(stop.replace(',', ''))
+            return SearchQuery('region', chrom.upper(), pos, stop, None, None, value)
+        match = _regex_chrom_variant.match(value)
+        if match is None:
+            return _gene(value)
+        chrom, pos, ref, alt, hgvs_pos, hgvs_ref, hgvs_alt = match.groups()
+        if hgvs_pos is not None:
+            pos = int(hgvs_pos)
+            return SearchQuery('variant', chrom.upper(), pos, pos, hgvs_ref.upper(), hgvs_alt.upper(), value)
+        pos = int(pos) if ',' not in pos else int(pos.replace(',', ''))
+        return SearchQuery('variant', chrom.upper(), pos, pos, ref.upper(), alt.upper(), value)
+    if first == 'r' or first == 'R':
+        if len(value) > 2 and value[1] in 'sS' and value[2:].isdigit():
+            return SearchQuery('rsid', None, None, None, None, None, 'rs' + value[2:])
+        return _gene(value)
+    if first == 'N' or first == 'n':
+        match = _regex_refseq_query.match(value)
+        if match is not None:
+            chrom = _refseq_chroms.get(match.group(1).upper(), None)
+            if chrom is not None:
+                pos = int(match.group(2))
+                return SearchQuery('variant', chrom, pos, pos, match.group(3).upper(), match.group(4).upper(), value)
+    return _gene(value)
@@ -0,0 +1,45 @@
+"""Gunicorn settings of the cooperative (gevent) serving mode.
+
+Usage (requires gunicorn and gevent packages): gunicorn -c config/gunicorn_gevent.py "bravo_browser:create_app()"
+
+Every worker runs a gevent loop: sockets, threads and locks are monkey-patched when the worker starts (before the app is
+loaded, so don't enable preload_app), so one worker serves up to `worker_connections` requests while they wait on
+BRAVO API and `ApiClient.submit`/`get_many` fan out API calls as greenlets. The BRAVO API connection pool and fan-out
+of every worker are sized to its concurrency in `post_worker_init`.
+
+Environment variables: BRAVO_UI_BIND (default 127.0.0.1:8089), BRAVO_UI_WORKERS (default number of CPUs),
+BRAVO_UI_WORKER_CONNECTIONS (default 500), BRAVO_API_POOL_MAXSIZE (default 100) and BRAVO_API_CONCURRENCY
+(default 100). The last two override the app's config file.
+"""
+import multiprocessing
+import os
+
+
+bind = os.getenv('BRAVO_UI_BIND', '127.0.0.1:8089')
+worker_class = 'gevent'
+workers = int(os.getenv('BRAVO_UI_WORKERS', multiprocessing.cpu_count()))
+worker_connections = int(os.getenv('BRAVO_UI_WORKER_CONNECTIONS', 500))
+timeout = 60
+keepalive = 5
+
+api_pool_maxsize = int(os.getenv('BRAVO_API_POOL_MAXSIZE', 100))
+api_concurrency = int(os.getenv('BRAVO_API_CONCURRENCY', 100))
+
+# Settings of the app's BRAVO API client for gevent workers, and their web_default.py values (meant for threaded workers)
+api_settings = {
+    'BRAVO_API_POOL_MAXSIZE': (api_pool_maxsize, 10),
+    'BRAVO_API_POOL_BLOCK': (True, False),
+    'BRAVO_API_CONCURRENCY': (api_concurrency, 10)
+}
+
+
+def post_worker_init(worker):
+    """Sizes BRAVO API pool and fan-out of the worker's app. Greenlets wait for a pooled connection (BRAVO_API_POOL_BLOCK)
+    instead of opening throwaway ones, so a burst of requests doesn't open hundreds of connections to API.
+
+    Settings which the app's config file changed from their defaults are kept, unless the environment variable is set.
+    """
+    config = worker.wsgi.config
+    for name, (value, default) in api_settings.items():
+        if name in os.environ or config.get(name, default) == default:
+            config[name] = value
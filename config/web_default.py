@@ -4,10 +4,63 @@ PROXY = False
 SECRET_KEY = b'deadbeef'
 URL_PREFIX = ''
 MONGO_URI = 'mongodb://localhost:27017/bravo-demo'  # mongodb://<host>:<port>/<database>
+USER_CACHE_TTL = 60 # seconds to keep users who agreed to terms in per-worker memory instead of loading them from MongoDB on every request; 0 disables
+USER_CACHE_MAX_ENTRIES = 10000 # max. users kept in per-worker memory
+WHITELIST_REFRESH_INTERVAL = 300 # seconds between background reloads of per-worker in-memory copy of the whitelist
+WHITELIST_COMPACT_THRESHOLD = 100000 # whitelists with more emails are kept as sorted 64-bit hashes instead of a set of strings
+WRITE_BEHIND = True # feedback and user picture updates are queued and written to MongoDB in batches by a background thread
+WRITE_BEHIND_MAX_QUEUE = 10000 # max. queued writes per worker; when the queue is full, writes are done synchronously
+WRITE_BEHIND_BATCH_SIZE = 500 # max. writes per MongoDB bulk write
+WRITE_BEHIND_FLUSH_INTERVAL = 1.0 # max. seconds a write waits in the queue for other writes to batch with
 # Base API URL to call
 BRAVO_API_URI = 'http://localhost:9099'
-GZIP_COMPRESSION = True
+# Per-worker keep-alive connection pool to BRAVO API
+BRAVO_API_POOL_CONNECTIONS = 1 # number of pooled hosts
+BRAVO_API_POOL_MAXSIZE = 10 # max. open connections per host; set to number of threads/greenlets per worker
+BRAVO_API_POOL_BLOCK = False # if True, requests wait for a free pooled connection instead of opening a throwaway one (recommended with gevent workers)
+BRAVO_API_MAX_RETRIES = 1 # retries on connection errors (e.g. stale keep-alive connection)
+BRAVO_API_TIMEOUT = (3.05, 30) # (connect, read) timeout in seconds
+BRAVO_API_ROUTE_TIMEOUTS = {} # per-route timeouts, e.g. { 'variants': (3.05, 60), 'autocomplete': (1, 2) }
+BRAVO_API_CONCURRENCY = 10 # max. concurrent background API calls per worker (greenlets when using gevent workers)
+BRAVO_API_SINGLE_FLIGHT = True # concurrent identical API calls within a worker share one request
+BRAVO_API_PREFETCH_TTL = 60 # seconds to keep the speculatively fetched next page of the variants table per user session; 0 disables prefetching
+BRAVO_API_PREFETCH_MAX_ENTRIES = 200 # max. prefetched pages per worker
+BRAVO_API_PREFETCH_MAX_BYTES = 32 * 1024 * 1024 # max. total size of prefetched pages per worker
+# Cache for API responses that don't change within a dataset release
+BRAVO_API_CACHE_BACKEND = 'memory' # 'memory' (per worker), 'disk' (per host), 'redis' (shared; requires redis package) or None
+BRAVO_API_CACHE_MAX_ENTRIES = 1000
+BRAVO_API_CACHE_MAX_BYTES = 64 * 1024 * 1024 # used by 'memory' backend
+# BRAVO_API_CACHE_DIR = '/path/to/api_cache' # used by 'disk' backend; defaults to api_cache in the instance folder
+BRAVO_API_CACHE_REDIS_URL = 'redis://localhost:6379/0' # used by 'redis' backend
+BRAVO_API_CACHE_TTLS = { # cached routes and their time-to-live in seconds
+   'genes': 86400,
+   'genes_by_name': 86400,
+   'variant': 86400,
+   'variant_cram_info': 86400,
+   'qc': 86400,
+   'variants_meta': 86400,
+   'coverage_binned': 86400
+}
+SEARCH_CACHE_TTL = 86400 # seconds to keep redirect targets of typed variant IDs, rsIDs and gene names in the cache above; 0 disables
+SEARCH_CACHE_NEGATIVE_TTL = 300 # seconds to remember typed values which were not found; 0 disables
+# Gene names for autocomplete, served in-process (see 'flask build-gene-index'); if the file is missing, API is queried
+# GENE_INDEX_FILE = '/path/to/genes.tsv.gz' # tab-delimited gene name, chrom, start, stop and type; reloaded when modified; defaults to genes.tsv.gz in the instance folder
+GENE_INDEX_CHECK_INTERVAL = 10 # seconds between checks for modified GENE_INDEX_FILE
+# rsIDs for search and autocomplete, binary-searched in memory-mapped table (see 'flask build-rsid-index'); if the file is missing, API is queried
+# RSID_INDEX_FILE = '/path/to/rsids.bin' # defaults to rsids.bin in the instance folder
+RSID_INDEX_CHECK_INTERVAL = 10 # seconds between checks for modified RSID_INDEX_FILE
+AUTOCOMPLETE_DEADLINE = 1.0 # seconds to wait for concurrent gene and rsID lookups of autocomplete; late suggestions are left out
+AUTOCOMPLETE_CACHE_MAX_ENTRIES = 10000 # per-worker LRU of autocomplete results; longer queries are answered from complete results of their prefixes
+AUTOCOMPLETE_CACHE_TTL = 3600 # seconds; 0 disables the autocomplete cache
+AUTOCOMPLETE_MAX_AGE = 3600 # Cache-Control max-age of autocomplete responses in browsers
+GZIP_COMPRESSION = True # compress JSON responses (zstd if zstandard package is installed, br, gzip) and serve precompressed static files
+COMPRESS_STATIC = True # serve static files from .zst/.br/.gz siblings (see 'flask compress-static') with strong ETags
+COMPRESS_STATIC_ON_STARTUP = False # write missing/outdated precompressed siblings of static files when app starts
+COMPRESS_STATIC_MAX_AGE = 31536000 # Cache-Control max-age of static files; their URLs are versioned by content hash
 GOOGLE_OAUTH_CLIENT_SECRET = '' # path to JSON file with Google OAuth2 client secret
+OAUTH_DISCOVERY_URL = 'https://accounts.google.com/.well-known/openid-configuration' # OpenID Connect discovery document; cached per worker as its Cache-Control allows
+OAUTH_DISCOVERY_DEFAULT_TTL = 3600 # seconds to cache discovery document if it has no cache headers
+OAUTH_TIMEOUT = (3.05, 10) # (connect, read) timeout in seconds of calls to identity provider
 
 # For home page and navigation bar
 SUBTITLE = ''
@@ -11,3 +11,7 @@ export BRAVO_UI_INSTANCE_DIR='./instance'
 flask run --port 8089
 
 # gunicorn -b 127.0.0.1:8089 -w 10 -k gevent "bravo_browser:create_app()"
+
+# Cooperative (gevent) mode: each worker serves hundreds of requests concurrently while they wait on BRAVO API.
+# See config/gunicorn_gevent.py for settings and environment variables.
+# gunicorn -c config/gunicorn_gevent.py "bravo_browser:create_app()"
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch
+from unittest.mock import patch, Mock
 from bravo_browser import create_app
 import bravo_browser.models.database
 from mongomock import MongoClient
@@ -42,3 +42,13 @@ def client(app):
 @pytest.fixture
 def config(app):
     return app.config
+
+
+@pytest.fixture
+def make_api_response():
+    """Returns factory of streamed `requests.Response` mocks, as returned by BRAVO API."""
+    def make(body, status_code = 200, headers = None):
+        response = Mock(status_code = status_code, headers = headers if headers is not None else { 'Content-Type': 'application/json' })
+        response.raw.read.return_value = body
+        return response
+    return make
@@ -0,0 +1,59 @@
+from unittest.mock import patch
+import requests
+import time
+from bravo_browser.api_client import api
+
+
+def test_session_reused(app):
+    with app.app_context():
+        session = api.session
+        assert api.session is session
+        adapter = session.get_adapter(app.config['BRAVO_API_URI'])
+        assert adapter._pool_maxsize == app.config['BRAVO_API_POOL_MAXSIZE']
+
+
+def test_route_timeout(app):
+    app.config['BRAVO_API_ROUTE_TIMEOUTS'] = { 'autocomplete': (1, 2) }
+    with app.test_request_context('/autocomplete?query=PCSK'):
+        assert api.timeout() == (1, 2)
+    with app.test_request_context('/qc/api'):
+        assert api.timeout() == app.config['BRAVO_API_TIMEOUT']
+
+
+def test_get_many_keeps_order(app, make_api_response):
+    def fake_get(session, url, **kwargs):
+        return make_api_response(url.encode())
+    with app.test_request_context('/'), patch.object(requests.Session, 'get', fake_get):
+        paths = [ f'/genes?name=GENE{i}' for i in range(20) ]
+        responses = api.get_many(paths)
+    assert [ response.content.decode() for response in responses ] == [ f"{app.config['BRAVO_API_URI']}{path}" for path in paths ]
+
+
+def test_identical_calls_coalesced(app, make_api_response):
+    calls = []
+    def fake_get(session, url, **kwargs):
+        calls.append(url)
+        time.sleep(0.1)
+        return make_api_response(b'{}')
+    with app.test_request_context('/'), patch.object(requests.Session, 'get', fake_get):
+        responses = api.get_many([ '/gene/snv/summary?name=PCSK9' ] * 5)
+    assert len(calls) == 1
+    assert all(response is responses[0] for response in responses)
+
+
+def test_gevent_worker_sizes_api_pool(app):
+    from types import SimpleNamespace
+    from config import gunicorn_gevent
+    gunicorn_gevent.post_worker_init(SimpleNamespace(wsgi = app))
+    with app.app_context():
+        api.close()
+        adapter = api.session.get_adapter(app.config['BRAVO_API_URI'])
+        assert adapter._pool_maxsize == gunicorn_gevent.api_pool_maxsize
+        assert adapter._pool_block
+        assert api.executor._max_workers == gunicorn_gevent.api_concurrency
+        api.close()
+    app.config['BRAVO_API_CONCURRENCY'] = 25  # set in the app's config file
+    app.config['BRAVO_API_POOL_MAXSIZE'] = 10
+    gunicorn_gevent.post_worker_init(SimpleNamespace(wsgi = app))
+    assert app.config['BRAVO_API_CONCURRENCY'] == 25
+    assert app.config['BRAVO_API_POOL_MAXSIZE'] == gunicorn_gevent.api_pool_maxsize
@@ -0,0 +1,51 @@
+from unittest.mock import patch
+from bravo_browser.cache import cache, normalize_url, MemoryBackend, DiskBackend
+from bravo_browser.api_client import BufferedResponse
+import requests
+
+
+def test_normalize_url():
+    assert normalize_url('/genes?stop=3&chrom=1&start=2') == normalize_url('/genes?chrom=1&start=2&stop=3')
+
+
+def test_memory_backend_lru():
+    backend = MemoryBackend(max_entries = 2, max_bytes = 1024)
+    backend.set('a', BufferedResponse(200, {}, b'a'), 60)
+    backend.set('b', BufferedResponse(200, {}, b'b'), 60)
+    backend.get('a')
+    backend.set('c', BufferedResponse(200, {}, b'c'), 60)
+    assert backend.get('b') is None
+    assert backend.get('a').body == b'a'
+    backend.set('d', BufferedResponse(200, {}, b'd' * 2048), 60)
+    assert backend.get('d') is None
+    backend.set('e', BufferedResponse(200, {}, b'e'), -1)
+    assert backend.get('e') is None
+
+
+def test_disk_backend(tmp_path):
+    backend = DiskBackend(str(tmp_path), max_entries = 10)
+    backend.set('/qc', BufferedResponse(200, {}, b'{"data": []}'), 60)
+    assert backend.get('/qc').json() == { 'data': [] }
+    assert backend.get('/genes') is None
+
+
+def test_cached_route(client, make_api_response):
+    api_response = make_api_response(b'{"data": []}')
+    with patch.object(requests.Session, 'get', return_value = api_response) as api_get:
+        hits = cache.hits
+        assert client.get('/qc/api').status_code == 200
+        assert client.get('/qc/api').status_code == 200
+        assert api_get.call_count == 1
+        assert cache.hits == hits + 1
+
+
+def test_cache_fails_open(client, make_api_response):
+    api_response = make_api_response(b'{"data": []}')
+    with patch.object(cache.backend, 'get', side_effect = ConnectionError('down')), \
+         patch.object(cache.backend, 'set', side_effect = OSError('disk full')), \
+         patch.object(requests.Session, 'get', return_value = api_response) as api_get:
+        errors = cache.errors
+        assert client.get('/qc/api').status_code == 200
+        assert client.get('/qc/api').status_code == 200
+        assert api_get.call_count == 2
+        assert cache.errors == errors + 4
@@ -0,0 +1,35 @@
+from unittest.mock import patch
+from bravo_browser import columnar
+import requests
+import json
+
+
+def test_roundtrip():
+    payload = {
+        'data': [
+            { 'start': 100, 'end': 149, 'mean': 8.25, 'median': 4, 'chrom': '22', 'filter': ['PASS'] },
+            { 'start': 150, 'end': 199, 'mean': 4.0, 'median': None, 'chrom': '22', 'filter': ['SVM'] }
+        ],
+        'next': None,
+        'total': 2,
+        'error': None
+    }
+    content = columnar.encode(payload)
+    types = { x['name']: x['type'] for x in json.loads(content[8:8 + int.from_bytes(content[4:8], 'little')])['columns'] }
+    assert types == { 'start': 'int32', 'end': 'int32', 'mean': 'float64', 'median': 'float64', 'chrom': 'json', 'filter': 'json' }
+    decoded = columnar.decode(content)
+    assert decoded['data'][0] == payload['data'][0]
+    assert decoded['data'][1]['median'] != decoded['data'][1]['median']  # NaN
+    assert decoded['total'] == 2 and decoded['next'] is None
+
+
+def test_coverage_negotiation(client, make_api_response):
+    page = b'{"data": [{"start": 100, "end": 149, "mean": 8.0}], "error": null, "next": "http://api/coverage?last=149"}'
+    with patch.object(requests.Session, 'get', return_value = make_api_response(page)):
+        response = client.post('/coverage/22-100-200', json = { 'size': 1, 'next': None }, headers = { 'Accept': columnar.MIMETYPE })
+        assert response.mimetype == columnar.MIMETYPE
+        payload = columnar.decode(response.get_data())
+        assert payload['data'] == [ { 'start': 100, 'end': 149, 'mean': 8.0 } ]
+        assert payload['next'] == '/coverage?last=149'
+        response = client.post('/coverage/22-100-200', json = { 'size': 1, 'next': None }, headers = { 'Accept': '*/*' })
+        assert response.mimetype == 'application/json'
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+from bravo_browser.compression import compress_directory
+import requests
+import json
+import brotli
+import gzip
+import re
+
+
+def test_compress_directory(tmp_path):
+    (tmp_path / 'bundle.js').write_bytes(b'var x = 1;' * 100)
+    (tmp_path / 'logo.png').write_bytes(b'\x89PNG')
+    assert compress_directory(str(tmp_path), ['br', 'gzip']) == 2
+    assert gzip.decompress((tmp_path / 'bundle.js.gz').read_bytes()) == b'var x = 1;' * 100
+    assert brotli.decompress((tmp_path / 'bundle.js.br').read_bytes()) == b'var x = 1;' * 100
+    assert not (tmp_path / 'logo.png.gz').exists()
+    assert compress_directory(str(tmp_path), ['br', 'gzip']) == 0
+
+
+def test_static_caching(client):
+    url = re.search(r'href="([^"]*bravosearch.css[^"]*)"', client.get('/about').get_data(as_text = True)).group(1)
+    assert '?v=' in url
+    response = client.get(url)
+    assert response.status_code == 200
+    assert 'max-age=31536000' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    assert not etag.startswith('W/')
+    response = client.get(url, headers = { 'If-None-Match': etag })
+    assert response.status_code == 304
+
+
+def test_json_compression(client, make_api_response):
+    content = json.dumps({ 'data': list(range(1000)), 'error': None }).encode()
+    with patch.object(requests.Session, 'get', return_value = make_api_response(content)):
+        response = client.get('/qc/api', headers = { 'Accept-Encoding': 'gzip;q=0.5, br' })
+    assert response.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(response.data) == content
@@ -0,0 +1,40 @@
+from unittest.mock import patch
+from bravo_browser.coverage import downsample
+import requests
+
+
+def test_downsample():
+    rows = [
+        { 'start': 1, 'end': 10, 'mean': 10.0 },
+        { 'start': 11, 'end': 15, 'mean': 20.0 },
+        { 'start': 16, 'end': 30, 'mean': 40.0 }
+    ]
+    bins = downsample(rows, 1, 40, 4)
+    assert [ (x['start'], x['end']) for x in bins ] == [ (1, 10), (11, 20), (21, 30) ]
+    assert bins[0]['mean'] == 10.0
+    assert bins[1]['mean'] == 30.0 and bins[1]['min'] == 20.0 and bins[1]['max'] == 40.0
+    assert len(downsample(rows, 1, 5, 100)) == 5
+
+
+def test_coverage_binned_cached(client, make_api_response):
+    page = b'{"data": [{"start": 100, "end": 149, "mean": 8.0}, {"start": 150, "end": 199, "mean": 4.0}], "error": null, "next": null}'
+    with patch.object(requests.Session, 'get', return_value = make_api_response(page)) as api_get:
+        for _ in range(2):
+            response = client.get('/coverage/22-100-199/binned?width=2')
+            assert response.status_code == 200
+            assert [ x['mean'] for x in response.get_json()['data'] ] == [ 8.0, 4.0 ]
+        assert api_get.call_count == 1
+
+
+def test_coverage_binned_pages(client, make_api_response):
+    pages = [
+        make_api_response(b'{"data": [{"start": 100, "end": 149, "mean": 8.0}], "error": null, "next": "/coverage?cursor=1"}'),
+        make_api_response(b'{"data": [{"start": 150, "end": 199, "mean": 4.0}], "error": null, "next": null}')
+    ]
+    with patch.object(requests.Session, 'get', side_effect = pages):
+        response = client.get('/coverage/22-100-199/binned?width=1')
+        assert response.get_json()['data'] == [ { 'start': 100, 'end': 199, 'mean': 6.0, 'min': 4.0, 'max': 8.0 } ]
+    with patch.object(requests.Session, 'get', return_value = make_api_response(b'{"data": null, "error": "failed", "next": null}')):
+        assert client.get('/coverage/22-300-399/binned?width=1').status_code == 404
+    for region in [ '22-200-199', '22-200-100' ]:
+        assert client.get(f'/coverage/{region}/binned?width=1').status_code == 422
@@ -0,0 +1,21 @@
+from unittest.mock import patch
+from mongomock import MongoClient
+from bravo_browser.models import database
+
+
+def test_load_whitelist(app, tmp_path):
+    whitelist_file = tmp_path / 'whitelist.txt'
+    whitelist_file.write_text('a@b.c\n\nnot-an-email\nd@e.f\n g@h.i \n')
+    mongo = MongoClient()
+    mongo.db.whitelist.insert_one({ 'user_id': 'old@b.c' })
+    with patch.object(database, 'mongo', mongo):
+        result = app.test_cli_runner().invoke(database.load_whitelist, [ str(whitelist_file), '--batch-size', '2' ])
+    assert result.exit_code == 0, result.output
+    assert 'Inserted 2 email(s)' in result.output
+    assert 'inserted 3 email(s)' in result.output
+    assert sorted(x['user_id'] for x in mongo.db.whitelist.find()) == [ 'a@b.c', 'd@e.f', 'g@h.i' ]
+    assert 'whitelist_staging' not in mongo.db.list_collection_names()
+    with patch.object(database, 'mongo', mongo):
+        result = app.test_cli_runner().invoke(database.load_whitelist, [ str(whitelist_file), '--batch-size', '0' ])
+    assert result.exit_code == 2  # usage error
+    assert sorted(x['user_id'] for x in mongo.db.whitelist.find()) == [ 'a@b.c', 'd@e.f', 'g@h.i' ]
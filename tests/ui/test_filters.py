@@ -0,0 +1,42 @@
+from unittest.mock import patch
+from bravo_browser.filters import translate, allowed_values, FilterError
+from bravo_browser.api_client import api, BufferedResponse
+import requests
+import pytest
+
+
+def test_translate_canonical():
+    a = [ { 'field': 'filter', 'type': '=', 'value': 'PASS' }, [ { 'field': 'annotation.gene.lof', 'type': '=', 'value': 'LC' }, { 'field': 'annotation.gene.lof', 'type': '=', 'value': 'HC' } ] ]
+    b = [ [ { 'field': 'annotation.gene.lof', 'type': '=', 'value': 'HC' }, { 'field': 'annotation.gene.lof', 'type': '=', 'value': 'LC' } ], { 'value': 'PASS', 'type': '=', 'field': 'filter' } ]
+    assert translate(a) == translate(b) == [ 'annotation.gene.lof=eq:HC,eq:LC', 'filter=eq:PASS' ]
+    assert translate([ { 'field': 'allele_freq', 'type': '>=', 'value': 0.5 } ]) == [ 'allele_freq=gte:0.5' ]
+    assert translate([ { 'field': 'filter', 'type': '=', 'value': 'a&b' } ]) == [ 'filter=eq:a%26b' ]
+
+
+def test_translate_invalid():
+    with pytest.raises(FilterError):
+        translate([ { 'field': 'filter', 'type': '~', 'value': 'PASS' } ])
+    with pytest.raises(FilterError):
+        translate([ { 'field': 'filter&x=1', 'type': '=', 'value': 'PASS' } ])
+    with pytest.raises(FilterError):
+        translate([ [ { 'field': 'filter', 'type': '=', 'value': 'PASS' }, { 'field': 'qual', 'type': '>', 'value': 1 } ] ])
+
+
+def test_invalid_filter_view(client, make_api_response):
+    metadata = make_api_response(b'{"data": {"filter": [{"value": "PASS"}, {"value": "SVM"}]}, "error": null}')
+    with patch.object(requests.Session, 'get', return_value = metadata) as api_get:
+        response = client.post('/variants/region/snv/22-100-200/summary', json = { 'filters': [ { 'field': 'filter', 'type': '=', 'value': 'BAD' } ] })
+        assert response.status_code == 422
+        assert api_get.call_count == 1
+        response = client.post('/variants/region/snv/22-100-200/summary', json = { 'filters': [ { 'field': 'filter', 'type': '=', 'value': 'SVM' } ] })
+        assert response.status_code == 200
+        assert api_get.call_args[0][0].endswith('/region/snv/summary?chrom=22&start=100&stop=200&filter=eq:SVM')
+
+
+def test_allowed_values_parsed_once(app):
+    body = b'{"data": {"filter": [{"value": "PASS"}]}, "error": null}'
+    def get(*args, **kwargs):  # as a disk or redis backend, returns a copy of the cached body
+        return BufferedResponse(200, { 'Content-Type': 'application/json' }, bytes(bytearray(body)))
+    with app.app_context(), patch.object(api, 'get', get), patch.object(BufferedResponse, 'json', autospec = True, side_effect = BufferedResponse.json) as parse:
+        assert allowed_values('sv') == allowed_values('sv') == { 'filter': frozenset([ 'PASS' ]) }
+        assert parse.call_count == 1
@@ -0,0 +1,72 @@
+from unittest.mock import patch
+from bravo_browser.genes import gene_index, build_gene_index
+import requests
+import threading
+import gzip
+import time
+
+
+GTF = '''##description: test
+chr22\tHAVANA\tgene\t100\t200\t.\t+\t.\tgene_id "ENSG1"; gene_type "protein_coding"; gene_name "PCSK9";
+chr22\tHAVANA\ttranscript\t100\t200\t.\t+\t.\tgene_id "ENSG1"; gene_type "protein_coding"; gene_name "PCSK9";
+chr22\tHAVANA\tgene\t300\t400\t.\t+\t.\tgene_id "ENSG2"; gene_type "lncRNA"; gene_name "PCSK9-AS1";
+chr1\tHAVANA\tgene\t500\t600\t.\t+\t.\tgene_id "ENSG3"; gene_type "protein_coding"; gene_name "APOB";
+'''
+
+
+def test_gene_index_autocomplete(app, client, tmp_path):
+    gtf_file = tmp_path / 'genes.gtf.gz'
+    gtf_file.write_bytes(gzip.compress(GTF.encode()))
+    app.config['GENE_INDEX_FILE'] = str(tmp_path / 'genes.tsv.gz')
+    result = app.test_cli_runner().invoke(build_gene_index, [ str(gtf_file) ])
+    assert 'Wrote 3 gene(s)' in result.output
+    gene_index.init_app(app)
+    assert gene_index.search('pcsk') == [ ('PCSK9', '22', 100, 200, 'protein_coding'), ('PCSK9-AS1', '22', 300, 400, 'lncRNA') ]
+    assert gene_index.search('pcsk', limit = 1) == [ ('PCSK9', '22', 100, 200, 'protein_coding') ]
+    assert gene_index.search('X') == []
+    with patch.object(requests.Session, 'get') as api_get:
+        response = client.get('/autocomplete?query=APO')
+        assert api_get.call_count == 0
+    assert response.get_json()['suggestions'] == [ { 'value': 'APOB', 'data': { 'feature': 'gene', 'chrom': '1', 'start': 500, 'stop': 600, 'type': 'protein_coding' } } ]
+
+
+def test_autocomplete_deadline(app, client, make_api_response):
+    app.config['AUTOCOMPLETE_DEADLINE'] = 0.2
+    release = threading.Event()
+    def fake_get(session, url, **kwargs):
+        if '/genes?' in url:
+            release.wait(5)  # slower than the deadline
+            return make_api_response(b'{"data": [], "error": null}')
+        return make_api_response(b'{"data": [{"variant_id": "22-100-A-C", "rsids": ["rs123"], "annotation": {"region": {"consequence": ["intron_variant"]}}}], "error": null}')
+    with patch.object(requests.Session, 'get', fake_get):
+        start = time.monotonic()
+        response = client.get('/autocomplete?query=rs12')
+        assert time.monotonic() - start < 2
+        release.set()
+    assert response.get_json()['suggestions'] == [ { 'value': 'rs123', 'data': { 'feature': 'snv', 'variant_id': '22-100-A-C', 'type': 'intron_variant' } } ]
+
+
+def test_autocomplete_prefix_cache(client, make_api_response):
+    snv = b'{"data": [{"variant_id": "22-100-A-C", "rsids": ["rs12", "rs1234"], "annotation": {"region": {"consequence": ["intron_variant"]}}}, {"variant_id": "22-200-A-C", "rsids": ["rs15"], "annotation": {"region": {"consequence": ["intron_variant"]}}}], "error": null}'
+    def fake_get(session, url, **kwargs):
+        return make_api_response(snv if '/snv?' in url else b'{"data": [], "error": null}')
+    with patch.object(requests.Session, 'get', side_effect = fake_get, autospec = True) as api_get:
+        response = client.get('/autocomplete?query=rs1')
+        assert [ x['value'] for x in response.get_json()['suggestions'] ] == [ 'rs12', 'rs15' ]
+        assert response.cache_control.max_age == 3600
+        assert api_get.call_count == 2
+        response = client.get('/autocomplete?query=rs123')
+        assert [ x['value'] for x in response.get_json()['suggestions'] ] == [ 'rs1234' ]
+        response = client.get('/autocomplete?query=rs1')
+        assert api_get.call_count == 2
+
+
+def test_autocomplete_failed_lookup_not_cached(client, make_api_response):
+    with patch.object(requests.Session, 'get', return_value = make_api_response(b'{"data": null, "error": "unavailable"}', 503)):
+        response = client.get('/autocomplete?query=B')
+        assert response.get_json()['suggestions'] == []
+        assert response.cache_control.no_cache
+    genes = b'{"data": [{"gene_name": "BRCA1", "chrom": "17", "start": 100, "stop": 200, "gene_type": "protein_coding"}], "error": null}'
+    with patch.object(requests.Session, 'get', return_value = make_api_response(genes)):
+        response = client.get('/autocomplete?query=BRCA')
+        assert [ x['value'] for x in response.get_json()['suggestions'] ] == [ 'BRCA1' ]
@@ -0,0 +1,32 @@
+from unittest.mock import patch, Mock
+from bravo_browser.oauth import oauth, cache_lifetime
+import requests
+import json
+
+
+def test_cache_lifetime():
+    assert cache_lifetime({ 'Cache-Control': 'public, max-age=3600', 'Age': '600' }, 10) == 3000
+    assert cache_lifetime({ 'Cache-Control': 'no-cache, no-store' }, 10) == 0
+    assert cache_lifetime({ 'Expires': 'Thu, 01 Jan 1970 00:00:00 GMT' }, 10) == 0
+    assert cache_lifetime({}, 10) == 10
+
+
+def test_discovery_and_client_config(app, tmp_path):
+    secret_file = tmp_path / 'client_secret.json'
+    secret_file.write_text(json.dumps({ 'web': {
+        'client_id': 'id', 'client_secret': 'secret', 'auth_uri': 'http://idp/auth', 'token_uri': 'http://idp/token' } }))
+    app.config['GOOGLE_OAUTH_CLIENT_SECRET'] = str(secret_file)
+    app.config['OAUTH_DISCOVERY_URL'] = 'http://idp/.well-known/openid-configuration'
+    def fake_get(session, url, **kwargs):
+        if url == app.config['OAUTH_DISCOVERY_URL']:
+            return Mock(headers = { 'Cache-Control': 'public, max-age=3600' }, json = lambda: { 'userinfo_endpoint': 'http://idp/userinfo' })
+        assert url == 'http://idp/userinfo' and kwargs['headers']['Authorization'] == 'Bearer token'
+        return Mock(headers = {}, json = lambda: { 'email': 'a@b.c', 'picture': '' })
+    with app.test_request_context(), patch.object(requests.Session, 'get', side_effect = fake_get, autospec = True) as idp_get:
+        with patch('builtins.open', wraps = open) as open_file:
+            assert oauth.flow().client_config['client_id'] == 'id'
+            assert oauth.flow(state = 'state').client_config['client_id'] == 'id'
+            assert open_file.call_count == 1
+        assert oauth.userinfo('token')['email'] == 'a@b.c'
+        assert oauth.userinfo('token')['email'] == 'a@b.c'
+        assert [ call[0][1] for call in idp_get.call_args_list ].count(app.config['OAUTH_DISCOVERY_URL']) == 1
@@ -0,0 +1,144 @@
+from unittest.mock import patch
+from bravo_browser.browser import _strip_next_origin
+from bravo_browser.api_client import api
+import requests
+import gzip
+import time
+import json
+
+
+def test_strip_next_origin():
+    content = b'{"data": [{"next": "http://a/b"}], "next": "http://localhost:9099/region/snv?last=1-100&limit=100", "total": 1}'
+    assert _strip_next_origin(content) == b'{"data": [{"next": "http://a/b"}], "next": "/region/snv?last=1-100&limit=100", "total": 1}'
+    assert _strip_next_origin(b'{"data": [], "next": null}') == b'{"data": [], "next": null}'
+
+
+def test_variants_passthrough(client, make_api_response):
+    content = b'{"data": [], "error": null, "limit": 100, "next": "https://api.example.org/region/snv?last=1", "total": 0}'
+    api_response = make_api_response(content)
+    with patch.object(requests.Session, 'get', return_value = api_response):
+        response = client.post('/variants/region/snv/22-100-200', json = { 'size': 100 })
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    assert response.get_json()['next'] == '/region/snv?last=1'
+
+
+def test_compressed_passthrough(client, make_api_response):
+    body = gzip.compress(b'{"data": [], "error": null}')
+    api_response = make_api_response(body, headers = { 'Content-Type': 'application/json', 'Content-Encoding': 'gzip' })
+    with patch.object(requests.Session, 'get', return_value = api_response):
+        response = client.get('/qc/api', headers = { 'Accept-Encoding': 'gzip' })
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.data == body
+        response = client.get('/qc/api', headers = { 'Accept-Encoding': 'identity' })
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_json() == { 'data': [], 'error': None }
+
+
+def test_variants_stream(client, make_api_response):
+    pages = {
+        '/region/snv?chrom=22&start=100&stop=200&limit=2': b'{"data": [{"pos": 101}, {"pos": 102}], "error": null, "next": "http://api/region/snv?last=102"}',
+        '/region/snv?last=102': b'{"data": [{"pos": 150}], "error": null, "next": null}'
+    }
+    def fake_get(session, url, **kwargs):
+        return make_api_response(pages[url[len('http://localhost:9099'):]])
+    with patch.object(requests.Session, 'get', fake_get):
+        response = client.post('/variants/region/snv/22-100-200/stream', json = { 'size': 2 })
+        assert response.mimetype == 'application/x-ndjson'
+        lines = response.get_data(as_text = True).splitlines()
+    assert [ json.loads(line)['pos'] for line in lines ] == [ 101, 102, 150 ]
+
+
+def test_coverage_all(client, make_api_response):
+    pages = {
+        '/coverage?chrom=22&start=100&stop=200&limit=2': b'{"data": [{"start": 100}, {"start": 101}], "error": null, "next": "http://api/coverage?last=101"}',
+        '/coverage?last=101': b'{"data": [{"start": 102}], "error": null, "next": null}'
+    }
+    def fake_get(session, url, **kwargs):
+        return make_api_response(pages[url[len('http://localhost:9099'):]])
+    with patch.object(requests.Session, 'get', fake_get):
+        response = client.post('/coverage/22-100-200/all', json = { 'size': 2 }, headers = { 'Accept-Encoding': 'gzip' })
+        assert response.headers['Content-Encoding'] == 'gzip'
+        payload = json.loads(gzip.decompress(response.get_data()))
+    assert [ x['start'] for x in payload['data'] ] == [ 100, 101, 102 ]
+    assert payload['total'] == 3 and payload['next'] is None and payload['error'] is None
+
+
+def test_pages_connection_error(client, make_api_response):
+    def fake_get(session, url, **kwargs):
+        if 'last=' in url:
+            raise requests.exceptions.ConnectionError('API is down')
+        return make_api_response(b'{"data": [{"start": 100, "end": 149, "mean": 1.0, "pos": 100}], "error": null, "next": "http://api/region?last=100"}')
+    with patch.object(requests.Session, 'get', fake_get):
+        payload = client.post('/coverage/22-100-200/all', json = { 'size': 1 }).get_json()
+        assert [ x['start'] for x in payload['data'] ] == [ 100 ] and payload['error']
+        lines = client.post('/variants/region/snv/22-100-200/stream', json = { 'size': 1 }).get_data(as_text = True).splitlines()
+        assert json.loads(lines[0])['pos'] == 100 and json.loads(lines[-1])['error']
+        assert client.get('/coverage/22-100-200/binned?width=1').status_code == 404
+
+
+def test_region_batch(client, make_api_response):
+    pages = {
+        '/region/snv/summary?chrom=22&start=100&stop=200': b'{"data": {"all": 2}, "error": null}',
+        '/genes?chrom=22&start=100&stop=200&full=1': b'{"data": [], "error": null}',
+        '/region/snv?chrom=22&start=100&stop=200&limit=2': b'{"data": [{"pos": 101}], "error": null, "next": "http://api/region/snv?last=101"}'
+    }
+    def fake_get(session, url, **kwargs):
+        path = url[len('http://localhost:9099'):]
+        if '/histogram' in path:
+            raise requests.exceptions.ReadTimeout('API is slow')
+        return make_api_response(pages[path]) if path in pages else make_api_response(b'', status_code = 500)
+    with patch.object(requests.Session, 'get', fake_get):
+        queries = { 'summary': {}, 'histogram': {}, 'genes': None, 'variants': { 'size': 2 }, 'coverage': {} }
+        response = client.post('/batch/region/snv/22-100-200', json = queries)
+        assert response.status_code == 200
+        payload = response.get_json()
+        assert sorted(payload) == [ 'coverage', 'genes', 'histogram', 'summary', 'variants' ]
+        assert payload['summary']['data'] == { 'all': 2 }
+        assert payload['variants']['next'] == '/region/snv?last=101'
+        assert payload['coverage']['error'] == 'BRAVO API returned status code 500.'
+        assert payload['histogram'] == { 'data': None, 'error': 'BRAVO API is not available.' }
+        response = client.post('/batch/region/snv/22-100-200', json = queries, headers = { 'Accept': 'multipart/mixed' })
+        assert response.mimetype == 'multipart/mixed'
+        assert response.get_data().count(b'Content-ID: <') == 5
+        assert client.post('/batch/region/snv/22-100-200', json = { 'unknown': {} }).status_code == 422
+
+
+def test_variants_prefetch(client, make_api_response):
+    pages = {
+        '/region/snv?chrom=22&start=100&stop=200&limit=1': b'{"data": [{"pos": 101}], "error": null, "next": "http://api/region/snv?last=101&limit=1"}',
+        '/region/snv?last=101&limit=1': b'{"data": [{"pos": 150}], "error": null, "next": null}'
+    }
+    calls = []
+    def fake_get(session, url, **kwargs):
+        calls.append(url[len('http://localhost:9099'):])
+        return make_api_response(pages[calls[-1]])
+    with patch.object(requests.Session, 'get', fake_get):
+        response = client.post('/variants/region/snv/22-100-200', json = { 'size': 1 })
+        assert response.get_json()['next'] == '/region/snv?last=101&limit=1'
+        with client.session_transaction() as session:
+            owner = session['_prefetch_id']
+        deadline = time.monotonic() + 5
+        while api.prefetched('/region/snv?last=101&limit=1', owner) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        response = client.post('/variants/region/snv/22-100-200', json = { 'size': 1, 'next': '/region/snv?last=101&limit=1' })
+        assert response.get_json()['data'] == [ { 'pos': 150 } ]
+    assert calls.count('/region/snv?last=101&limit=1') == 1
+
+
+def test_variants_page_without_next_sets_no_session(client, make_api_response):
+    api_response = make_api_response(b'{"data": [{"pos": 150}], "error": null, "next": null}')
+    with patch.object(requests.Session, 'get', return_value = api_response):
+        response = client.post('/variants/region/snv/22-100-200', json = { 'size': 1 })
+        assert response.get_json()['data'] == [ { 'pos': 150 } ]
+        assert 'Set-Cookie' not in response.headers
+
+
+def test_variants_page_decompressed_once(client, make_api_response):
+    body = gzip.compress(b'{"data": [{"pos": 150}], "error": null, "next": null}')
+    api_response = make_api_response(body, headers = { 'Content-Type': 'application/json', 'Content-Encoding': 'gzip' })
+    with patch.object(requests.Session, 'get', return_value = api_response), \
+         patch.object(gzip, 'decompress', wraps = gzip.decompress) as decompress:
+        response = client.post('/variants/region/snv/22-100-200', json = { 'size': 1 })
+        assert response.get_json()['data'] == [ { 'pos': 150 } ]
+        assert decompress.call_count == 1
@@ -0,0 +1,58 @@
+from unittest.mock import patch
+from bravo_browser.rsids import RsidIndex, rsid_index, build_rsid_index
+import requests
+import pytest
+
+
+TSV = '''#CHROM\tPOS\tID\tREF\tALT
+chr22\t100\trs12\tA\tC,G\tintron_variant
+22\t200\trs123;rs5\tT\tC\tmissense_variant
+22\t300\trs13\tG\tA
+22\t400\t.\tG\tA
+'''
+
+
+def test_rsid_index(app, client, tmp_path, make_api_response):
+    tsv_file = tmp_path / 'rsids.tsv'
+    tsv_file.write_text(TSV)
+    app.config['RSID_INDEX_FILE'] = str(tmp_path / 'rsids.bin')
+    result = app.test_cli_runner().invoke(build_rsid_index, [ str(tsv_file) ])
+    assert 'Wrote 5 rsID(s)' in result.output
+    rsid_index.init_app(app)
+    assert rsid_index.lookup('rs12') == [ ('22-100-A-C', 'intron_variant'), ('22-100-A-G', 'intron_variant') ]
+    assert rsid_index.lookup('rs5') == [ ('22-200-T-C', 'missense_variant') ]
+    assert rsid_index.lookup('rs1') == []
+    assert rsid_index.search('rs1') == [ ('rs12', '22-100-A-C', 'intron_variant'), ('rs12', '22-100-A-G', 'intron_variant'), ('rs13', '22-300-G-A', ''), ('rs123', '22-200-T-C', 'missense_variant') ]
+    assert rsid_index.search('rs1', limit = 1) == [ ('rs12', '22-100-A-C', 'intron_variant') ]
+    with open(app.config['RSID_INDEX_FILE'], 'rb') as ifile:
+        table = ifile.read()
+    result = app.test_cli_runner().invoke(build_rsid_index, [ str(tsv_file), '--chunk-size', '2' ])  # sorted runs are merged
+    assert 'Wrote 5 rsID(s)' in result.output
+    with open(app.config['RSID_INDEX_FILE'], 'rb') as ifile:
+        assert ifile.read() == table
+    assert sorted(tmp_path.iterdir()) == sorted([ tsv_file, tmp_path / 'rsids.bin' ])  # run files are removed
+    with patch.object(requests.Session, 'get') as api_get:
+        response = client.get('/search', query_string = { 'value': 'rs123' })
+        assert response.location.endswith('/variant/snv/22-200-T-C')
+        response = client.get('/autocomplete?query=rs12')
+        assert [ x['value'] for x in response.get_json()['suggestions'] ] == [ 'rs12', 'rs12', 'rs123' ]
+        assert all(call[0][0].endswith('/genes?name=rs12') for call in api_get.call_args_list)
+    snv = b'{"data": [{"variant_id": "22-500-C-T", "rsids": ["rs7"]}], "error": null}'
+    with patch.object(requests.Session, 'get', return_value = make_api_response(snv)) as api_get:  # not in the local table
+        response = client.get('/search', query_string = { 'value': 'rs7' })
+        assert response.location.endswith('/variant/snv/22-500-C-T')
+        assert api_get.call_args[0][0].endswith('/snv?variant_id=rs7')
+
+
+def test_rsid_index_truncated(app, tmp_path):
+    tsv_file = tmp_path / 'rsids.tsv'
+    tsv_file.write_text(TSV)
+    app.config['RSID_INDEX_FILE'] = str(tmp_path / 'rsids.bin')
+    app.test_cli_runner().invoke(build_rsid_index, [ str(tsv_file) ])
+    table = (tmp_path / 'rsids.bin').read_bytes()
+    for size in [ 12, 40, len(table) - 1 ]:
+        (tmp_path / 'rsids.bin').write_bytes(table[:size])
+        with pytest.raises(ValueError):
+            RsidIndex._map(app.config['RSID_INDEX_FILE'])
+        rsid_index.init_app(app)
+        assert not rsid_index.loaded and rsid_index.lookup('rs12') == []
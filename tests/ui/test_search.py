@@ -1,5 +1,39 @@
+from unittest.mock import patch
+from bravo_browser.search_query import classify, SearchQuery
+import requests
+
+
 # Search redirects to appropriate endpoint
 def test_search(client, config):
     data = {'value': 'chr77:50000-50100'}
     response = client.get('/search', query_string=data)
     assert response.status_code == 302
+
+
+def test_search_resolution_cache(client, make_api_response):
+    snv = b'{"data": [{"variant_id": "22-100-A-C", "rsids": ["rs123"]}], "error": null}'
+    with patch.object(requests.Session, 'get', return_value = make_api_response(snv)) as api_get:
+        for value in [ 'rs123', 'rs123', 'chr22-100-a-c', '22:100:A:C' ]:
+            response = client.get('/search', query_string = { 'value': value })
+            assert response.status_code == 302
+            assert response.location.endswith('/variant/snv/22-100-A-C')
+        assert api_get.call_count == 2
+        for value in [ 'rs999', 'rs999' ]:
+            response = client.get('/search', query_string = { 'value': value })
+            assert '/not_found/' in response.location
+        assert api_get.call_count == 3
+
+
+def test_classify():
+    assert classify('chr22:50,000-50,100') == SearchQuery('region', '22', 50000, 50100, None, None, 'chr22:50,000-50,100')
+    assert classify('chr22:50000-50100') == SearchQuery('region', '22', 50000, 50100, None, None, 'chr22:50000-50100')
+    assert classify('CHRmt:1-2')[:4] == ('region', 'MT', 1, 2)
+    assert classify('chr77:1-2')[:4] == ('region', '77', 1, 2)
+    assert classify('chr22:1²-2').kind == 'gene'
+    assert classify(' x:100 ')[:4] == ('position', 'X', 100, 100)
+    assert classify('chr22-100-a-c')[:6] == ('variant', '22', 100, 100, 'A', 'C')
+    assert classify('22:g.100A>C')[:6] == ('variant', '22', 100, 100, 'A', 'C')
+    assert classify('NC_000023.11:g.100del') == SearchQuery('gene', None, None, None, None, None, 'NC_000023.11:g.100del')
+    assert classify('NC_000023.11:g.100A>C')[:6] == ('variant', 'X', 100, 100, 'A', 'C')
+    assert classify('RS123') == SearchQuery('rsid', None, None, None, None, None, 'rs123')
+    assert classify('PCSK9').kind == 'gene'
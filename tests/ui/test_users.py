@@ -0,0 +1,71 @@
+from unittest.mock import patch
+from mongomock import MongoClient
+from pymongo import UpdateOne
+from bravo_browser.models import users, feedbacks
+from bravo_browser.models.write_behind import write_behind
+import threading
+
+
+def test_user_cache(app):
+    mongo = MongoClient()
+    with app.app_context(), patch.object(users, 'mongo', mongo):
+        users.save('a@b.c', 'picture.png')
+        assert users.load('a@b.c')['agreed_to_terms'] is False
+        users.update_agreed_to_terms('a@b.c', True)
+        with patch.object(mongo.db.users, 'find_one', wraps = mongo.db.users.find_one) as find_one, patch.object(mongo.db.users, 'bulk_write') as bulk_write:
+            assert users.load('a@b.c')['agreed_to_terms'] is True
+            assert users.load('a@b.c')['agreed_to_terms'] is True
+            assert find_one.call_count == 1
+            users.update_picture('a@b.c', 'new.png')
+            assert users.load('a@b.c')['picture'] == 'new.png'  # cached copy is updated, write is queued
+            assert find_one.call_count == 1
+            write_behind.flush()
+            bulk_write.assert_called_once_with([ UpdateOne({'user_id': 'a@b.c'}, {'$set': {'picture': 'new.png'}}) ], ordered = False)
+            users.init_app(app)  # new app starts with empty cache
+            users.load('a@b.c')
+            assert find_one.call_count == 2
+
+
+def test_whitelist(app):
+    mongo = MongoClient()
+    with app.app_context(), patch.object(users, 'mongo', mongo):
+        whitelist = users.Whitelist()
+        assert 'a@b.c' in whitelist  # no whitelist
+        mongo.db.whitelist.insert_many([ { 'user_id': 'a@b.c' }, { 'user_id': 'd@e.f' } ])
+        whitelist.invalidate()
+        with patch.object(mongo.db.whitelist, 'find', wraps = mongo.db.whitelist.find) as find:
+            assert 'a@b.c' in whitelist
+            assert 'x@y.z' not in whitelist
+            assert find.call_count == 1
+        app.config['WHITELIST_COMPACT_THRESHOLD'] = 1
+        whitelist.invalidate()
+        assert 'd@e.f' in whitelist
+        assert 'x@y.z' not in whitelist
+        app.config['WHITELIST_REFRESH_INTERVAL'] = 0
+        mongo.db.whitelist.insert_one({ 'user_id': 'x@y.z' })
+        assert 'x@y.z' not in whitelist  # served from the previous copy while it is refreshed in background
+        for thread in threading.enumerate():
+            if thread.name == 'bravo-whitelist':
+                thread.join()
+        app.config['WHITELIST_REFRESH_INTERVAL'] = 300
+        assert 'x@y.z' in whitelist
+
+
+def test_write_behind(app):
+    mongo = MongoClient()
+    app.config['WRITE_BEHIND_FLUSH_INTERVAL'] = 60
+    write_behind.init_app(app)
+    with app.app_context(), patch.object(feedbacks, 'mongo', mongo):
+        with patch.object(mongo.db.feedbacks, 'bulk_write', wraps = mongo.db.feedbacks.bulk_write) as bulk_write:
+            for i in range(3):
+                feedbacks.save('a@b.c', f'/page/{i}', 'message')
+            feedbacks.save('a@b.c', '/page', ' ')
+            assert mongo.db.feedbacks.count_documents({}) == 0  # queued, not written by the request
+            write_behind.flush()
+            assert mongo.db.feedbacks.count_documents({}) == 3
+            assert bulk_write.call_count <= 2  # the worker may have taken the first one before the rest were queued
+    with patch.object(mongo.db.users, 'bulk_write') as bulk_write:
+        write_behind._write([ (mongo.db.users, ('update', {'user_id': x}, {'$set': {'picture': 'a.png'}})) for x in [ 'a', 'b', 'a' ] ])
+        bulk_write.assert_called_once()
+        assert len(bulk_write.call_args[0][0]) == 3
+        assert bulk_write.call_args[1] == { 'ordered': True }  # updates of 'a' are applied in order